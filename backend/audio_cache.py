@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from typing import List, Optional, Tuple
+
+AUDIO_CACHE_DIR = os.getenv(
+    "AUDIO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "tts")
+)
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds between full scans of the directory, which pick up other
+# workers' files; a worker that goes over budget sweeps straight away
+AUDIO_CACHE_SWEEP_SECONDS = float(os.getenv("AUDIO_CACHE_SWEEP_SECONDS", "300"))
+# A sweep over budget trims to this fraction of max_bytes, so the next
+# few saves don't trigger another
+EVICT_TO = 0.9
+
+# Each chunk on disk: seconds since the first chunk (f32), length (u32), then MP3 bytes
+CHUNK_HEADER = struct.Struct("<fI")
+
+
+def audio_cache_key(voice_id: str, model_id: str, voice_settings: dict, text: str) -> str:
+    """Content address of a synthesized utterance."""
+    material = json.dumps(
+        [voice_id, model_id, voice_settings, " ".join(text.split())], sort_keys=True
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class AudioRecording:
+    """Collects an utterance's MP3 chunks with their arrival times."""
+
+    def __init__(self):
+        self.chunks: List[Tuple[float, bytes]] = []
+        self._started = None
+
+    def add(self, chunk: bytes):
+        now = time.perf_counter()
+        if self._started is None:
+            self._started = now
+        self.chunks.append((now - self._started, chunk))
+
+
+class AudioCache:
+    """Size-bounded, content-addressed cache of synthesized audio on local disk.
+
+    One file per utterance holds its MP3 chunks in order, each with the
+    offset it originally arrived at, so replay can keep the pacing of a
+    live stream. The directory itself is the index, so every worker on
+    the host shares it: lookups open the file directly. Nothing touches
+    the disk until first use. Saves add to a running total of the
+    directory's size; when that goes over max_bytes, or every
+    sweep_interval seconds, a sweep rescans the directory and deletes the
+    least recently used files (by mtime, refreshed on every hit). File
+    I/O runs in a thread, never on the event loop.
+    """
+
+    def __init__(
+        self,
+        directory: str = AUDIO_CACHE_DIR,
+        max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+        sweep_interval: float = AUDIO_CACHE_SWEEP_SECONDS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        # Directory totals as of the last sweep plus this worker's saves since
+        self.entries = 0
+        self.total_bytes = 0
+        self.sweeps = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._swept_at = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    async def load(self, key: str) -> Optional[List[Tuple[float, bytes]]]:
+        chunks = await asyncio.to_thread(self._load, key)
+        if chunks is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return chunks
+
+    def _load(self, key: str) -> Optional[List[Tuple[float, bytes]]]:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            # Mark it recently used for every worker's eviction
+            os.utime(self._path(key))
+        except OSError:
+            return None
+
+        chunks = []
+        position = 0
+        while position < len(data):
+            offset, length = CHUNK_HEADER.unpack_from(data, position)
+            position += CHUNK_HEADER.size
+            chunks.append((offset, data[position : position + length]))
+            position += length
+        return chunks
+
+    async def save(self, key: str, recording: AudioRecording):
+        await asyncio.to_thread(self._save, key, recording.chunks)
+
+    def _save(self, key: str, chunks: List[Tuple[float, bytes]]):
+        data = b"".join(
+            CHUNK_HEADER.pack(offset, len(chunk)) + chunk for offset, chunk in chunks
+        )
+        if not data or len(data) > self.max_bytes:
+            return
+        if self._swept_at is None:
+            # First save: create the directory and learn what is in it
+            os.makedirs(self.directory, exist_ok=True)
+            self._sweep()
+        # Write then rename, so readers never see a partial file
+        temporary = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, self._path(key))
+        with self._lock:
+            self.entries += 1
+            self.total_bytes += len(data)
+            due = (
+                self.total_bytes > self.max_bytes
+                or time.monotonic() - self._swept_at >= self.sweep_interval
+            )
+        if due:
+            self._sweep()
+
+    def _sweep(self):
+        """Rescan the directory, deleting least recently used files if it is over max_bytes."""
+        # One sweep at a time; a save that finds one running leaves it to that
+        if not self._sweep_lock.acquire(blocking=self._swept_at is None):
+            return
+        try:
+            self._evict()
+        finally:
+            self._sweep_lock.release()
+
+    def _evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * EVICT_TO if total > self.max_bytes else total
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Another worker evicted it first
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self.entries = len(files) - removed
+            self.total_bytes = total
+            self.sweeps += 1
+            self._swept_at = time.monotonic()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.entries,
+            "bytes": self.total_bytes,
+            "sweeps": self.sweeps,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+async def replay(chunks: List[Tuple[float, bytes]]):
+    """Yield cached chunks at their original offsets from the first one."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for offset, chunk in chunks:
+        delay = started + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+audio_cache = AudioCache()
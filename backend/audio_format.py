@@ -0,0 +1,123 @@
+import numpy as np
+
+# Raw PCM encodings accepted on /ws and spoken by the STT engines
+PCM_DTYPES = {
+    "pcm_f32le": np.dtype("<f4"),
+    "pcm_s16le": np.dtype("<i2"),
+}
+ENCODINGS = tuple(PCM_DTYPES) + ("opus",)
+# Rates libopus can decode to directly
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def bytes_per_sample(encoding: str) -> int:
+    return PCM_DTYPES[encoding].itemsize
+
+
+def pcm_to_float32(data, encoding: str) -> np.ndarray:
+    """Decode raw PCM bytes into float32 samples in [-1, 1]."""
+    samples = np.frombuffer(data, dtype=PCM_DTYPES[encoding])
+    if encoding == "pcm_s16le":
+        return samples.astype(np.float32) * np.float32(1 / 32768)
+    return samples.astype(np.float32, copy=False)
+
+
+def float32_to_pcm(samples: np.ndarray, encoding: str) -> np.ndarray:
+    """Encode float32 samples as raw PCM, returned as a bytes-like array."""
+    if encoding == "pcm_s16le":
+        scaled = samples * np.float32(32768)
+        np.clip(scaled, -32768, 32767, out=scaled)
+        return scaled.astype("<i2")
+    return samples.astype("<f4", copy=False)
+
+
+class Resampler:
+    """Streaming sample-rate converter for float32 mono audio.
+
+    Downsampling runs a windowed-sinc low-pass first so content above the
+    new Nyquist frequency doesn't alias; samples are then linearly
+    interpolated at the output rate. Filter history and the fractional
+    read position carry over between calls, so chunk boundaries are
+    seamless.
+    """
+
+    def __init__(self, from_rate: int, to_rate: int, taps: int = 63):
+        self.step = from_rate / to_rate
+        self._kernel = None
+        if from_rate > to_rate:
+            cutoff = 0.45 * to_rate / from_rate
+            n = np.arange(taps) - (taps - 1) / 2
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+            self._kernel = (kernel / kernel.sum()).astype(np.float32)
+            self._history = np.zeros(taps - 1, dtype=np.float32)
+        # Unconsumed input and the position of the next output sample in it
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._position = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self._kernel is not None:
+            padded = np.concatenate((self._history, samples))
+            self._history = padded[padded.size - self._history.size :]
+            samples = np.convolve(padded, self._kernel, mode="valid").astype(np.float32)
+
+        buffered = np.concatenate((self._tail, samples))
+        # Interpolation needs a sample on either side of each output position
+        count = int(np.floor((buffered.size - 1 - self._position) / self.step)) + 1
+        if buffered.size < 2 or count <= 0:
+            self._tail = buffered
+            return np.zeros(0, dtype=np.float32)
+        positions = self._position + np.arange(count) * self.step
+        out = np.interp(positions, np.arange(buffered.size), buffered).astype(np.float32)
+
+        next_position = self._position + count * self.step
+        consumed = min(int(next_position), buffered.size)
+        self._tail = buffered[consumed:]
+        self._position = next_position - consumed
+        return out
+
+
+class AudioDecoder:
+    """Turns one /ws session's audio payloads into float32 samples at target_rate.
+
+    encoding is one of ENCODINGS; "opus" payloads are single Opus packets
+    and need opuslib (and libopus) installed.
+    """
+
+    def __init__(self, encoding: str = "pcm_f32le", sample_rate: int = 16000, target_rate: int = 16000):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported audio encoding: {encoding}")
+        if sample_rate <= 0:
+            raise ValueError(f"Invalid sample rate: {sample_rate}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.target_rate = target_rate
+        self._opus = None
+        if encoding == "opus":
+            import opuslib
+
+            if sample_rate not in OPUS_SAMPLE_RATES:
+                raise ValueError(f"Opus can't be decoded at {sample_rate} Hz")
+            # libopus decodes straight to the target rate when it can
+            if target_rate in OPUS_SAMPLE_RATES:
+                self.sample_rate = target_rate
+            self._opus = opuslib.Decoder(self.sample_rate, 1)
+        self._resampler = None
+        if self.sample_rate != target_rate:
+            self._resampler = Resampler(self.sample_rate, target_rate)
+
+    def passthrough(self, encoding: str) -> bool:
+        """Whether payloads are already raw encoding PCM at target_rate and can be written as-is."""
+        return self._opus is None and self._resampler is None and self.encoding == encoding
+
+    def decode(self, data) -> np.ndarray:
+        if not len(data):
+            return np.zeros(0, dtype=np.float32)
+        if self._opus is not None:
+            # 120 ms is the longest frame an Opus packet can hold
+            pcm = self._opus.decode(bytes(data), self.sample_rate * 120 // 1000)
+            samples = pcm_to_float32(pcm, "pcm_s16le")
+        else:
+            samples = pcm_to_float32(data, self.encoding)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        return samples
@@ -0,0 +1,145 @@
+import asyncio
+import struct
+import threading
+
+from metrics import audio_dropped_bytes
+
+# 30 seconds of 16 kHz float32 mono PCM
+DEFAULT_CAPACITY = 16000 * 4 * 30
+
+# Binary /ws audio frame: flags (u8), sequence number (u32 LE), then raw pcm_f32le
+AUDIO_FRAME_HEADER = struct.Struct("<BI")
+FRAME_FLAG_TERMINAL = 0x01
+
+
+def parse_audio_frame(frame):
+    """Split a binary /ws frame into (terminal, sequence, payload) without copying the payload."""
+    view = memoryview(frame)
+    if len(view) < AUDIO_FRAME_HEADER.size:
+        raise ValueError(f"Audio frame too short: {len(view)} bytes")
+    flags, sequence = AUDIO_FRAME_HEADER.unpack_from(view)
+    return (
+        bool(flags & FRAME_FLAG_TERMINAL),
+        sequence,
+        view[AUDIO_FRAME_HEADER.size :],
+    )
+
+
+class AudioProcessor:
+    """Bounded ring buffer of raw PCM bytes.
+
+    The /ws handler writes into it from the main event loop and the
+    transcription client reads from it. A reader may be waiting on another
+    thread's event loop, so readers are woken with call_soon_threadsafe on
+    whichever loop they are waiting on instead of polling.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._storage = bytearray(capacity)
+        self._view = memoryview(self._storage)
+        self._lock = threading.Lock()
+        # Absolute byte counters; positions in the ring are taken modulo capacity
+        self._read_total = 0
+        self._write_total = 0
+        self._waiters = []
+        self._closed = False
+        self.dropped_bytes = 0
+
+    @property
+    def available(self) -> int:
+        return self._write_total - self._read_total
+
+    @property
+    def total_written(self) -> int:
+        """Bytes written since creation or the last clear_buffer()."""
+        return self._write_total
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _copy_out(self, size):
+        start = self._read_total % self.capacity
+        end = start + size
+        if end <= self.capacity:
+            data = bytes(self._view[start:end])
+        else:
+            data = bytes(self._view[start:]) + bytes(
+                self._view[: end - self.capacity]
+            )
+        self._read_total += size
+        return data
+
+    async def read(self, chunk_size):
+        """Wait for chunk_size bytes. Returns fewer (possibly b"") once closed."""
+        return await self._read(chunk_size, chunk_size)
+
+    async def read_some(self, max_size):
+        """Wait for any audio and return up to max_size bytes; b"" once closed and drained."""
+        return await self._read(1, max_size)
+
+    async def _read(self, min_size, max_size):
+        while True:
+            with self._lock:
+                available = self.available
+                if available >= min_size or (self._closed and available):
+                    return self._copy_out(min(max_size, available))
+                if self._closed:
+                    return b""
+                loop = asyncio.get_running_loop()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter, min_size))
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    self._waiters = [w for w in self._waiters if w[1] is not waiter]
+
+    def _wake(self, force=False):
+        # Called with the lock held
+        available = self.available
+        for loop, waiter, needed in self._waiters:
+            if force or available >= needed:
+                loop.call_soon_threadsafe(_set_waiter, waiter)
+
+    def write_audio(self, data):
+        """Copy a bytes-like object into the ring, dropping the oldest audio on overflow."""
+        view = memoryview(data).cast("B")
+        size = len(view)
+        if size == 0:
+            return
+        with self._lock:
+            if size > self.capacity:
+                self.dropped_bytes += size - self.capacity
+                audio_dropped_bytes.inc(size - self.capacity)
+                view = view[size - self.capacity :]
+                size = self.capacity
+            overflow = self.available + size - self.capacity
+            if overflow > 0:
+                self._read_total += overflow
+                self.dropped_bytes += overflow
+                audio_dropped_bytes.inc(overflow)
+            start = self._write_total % self.capacity
+            first = min(size, self.capacity - start)
+            self._view[start : start + first] = view[:first]
+            if first < size:
+                self._view[: size - first] = view[first:]
+            self._write_total += size
+            self._wake()
+
+    def clear_buffer(self):
+        with self._lock:
+            self._read_total = self._write_total = 0
+            self.dropped_bytes = 0
+
+    def close(self):
+        """Mark end of stream; pending and future reads drain what is left then return b""."""
+        with self._lock:
+            self._closed = True
+            self._wake(force=True)
+
+
+def _set_waiter(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
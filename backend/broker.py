@@ -0,0 +1,209 @@
+import asyncio
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+
+from tracing import log
+
+BROKER_URL = os.getenv("BROKER_URL", "")
+BROKER_QUEUE_SIZE = int(os.getenv("BROKER_QUEUE_SIZE", "4096"))
+# Backoff between attempts to reach the broker after it goes away
+BROKER_RECONNECT_DELAY = float(os.getenv("BROKER_RECONNECT_DELAY", "0.5"))
+BROKER_RECONNECT_MAX_DELAY = float(os.getenv("BROKER_RECONNECT_MAX_DELAY", "8"))
+
+# Identifies this process so it can ignore its own broadcasts
+WORKER_ID = uuid.uuid4().hex
+
+
+class Broker(ABC):
+    """Pub/sub between worker processes.
+
+    Handlers are plain callables taking the raw message bytes and run on
+    the event loop. publish() only enqueues; a single writer task sends
+    messages in order, so audio chunks for one user can't be reordered.
+    Only messages published as droppable (audio) may be shed under load.
+    """
+
+    # Whether messages can reach subscribers in other processes
+    remote = False
+
+    def __init__(self):
+        self._handlers = {}
+        self._reconnect_handlers = []
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def subscribe(self, channel: str, handler):
+        self._handlers[channel] = handler
+
+    async def unsubscribe(self, channel: str):
+        self._handlers.pop(channel, None)
+
+    def on_reconnect(self, callback):
+        """Run callback after the connection is restored; messages sent meanwhile may be lost."""
+        self._reconnect_handlers.append(callback)
+
+    @abstractmethod
+    def publish(self, channel: str, message: bytes, droppable: bool = False):
+        ...
+
+    def _dispatch(self, channel: str, message: bytes):
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            handler(message)
+        except Exception as e:
+            print(f"Error handling broker message on {channel}: {e}")
+
+
+class InProcessBroker(Broker):
+    """Default single-process broker: delivers only to local subscribers."""
+
+    def publish(self, channel: str, message: bytes, droppable: bool = False):
+        if channel in self._handlers:
+            asyncio.get_running_loop().call_soon(self._dispatch, channel, message)
+
+
+class RedisBroker(Broker):
+    """Broker over Redis pub/sub (or any server speaking the same protocol).
+
+    The outbound queue holds max_queue messages; past that the oldest
+    droppable one goes, while signaling and call events are always kept.
+    A lost connection is retried with backoff, resubscribing every
+    channel, and failed publishes are retried rather than discarded.
+    """
+
+    remote = True
+
+    def __init__(self, url: str, max_queue: int = BROKER_QUEUE_SIZE):
+        super().__init__()
+        self.url = url
+        self.dropped = 0
+        self.reconnects = 0
+        self._max_queue = max_queue
+        # (channel, message, droppable)
+        self._queue = deque()
+        self._ready = asyncio.Event()
+        self._client = None
+        self._pubsub = None
+        self._tasks = []
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def start(self):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(self.url)
+        await self._connect()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._drain()),
+        ]
+
+    async def _connect(self):
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        # listen() returns as soon as nothing is subscribed, so hold a
+        # per-worker channel open for the lifetime of the broker
+        await self._pubsub.subscribe(f"worker:{WORKER_ID}", *self._handlers)
+
+    async def close(self):
+        # Give queued messages (e.g. presence updates) a moment to go out
+        for _ in range(100):
+            if not self._queue:
+                break
+            await asyncio.sleep(0.01)
+        for task in self._tasks:
+            task.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def subscribe(self, channel: str, handler):
+        await super().subscribe(channel, handler)
+        try:
+            await self._pubsub.subscribe(channel)
+        except Exception as e:
+            # Resubscribed along with the rest once the connection is back
+            log.warning("Error subscribing to %s: %s", channel, e)
+
+    async def unsubscribe(self, channel: str):
+        await super().unsubscribe(channel)
+        try:
+            await self._pubsub.unsubscribe(channel)
+        except Exception as e:
+            log.warning("Error unsubscribing from %s: %s", channel, e)
+
+    def publish(self, channel: str, message: bytes, droppable: bool = False):
+        if len(self._queue) >= self._max_queue:
+            self._drop_oldest()
+        self._queue.append((channel, message, droppable))
+        self._ready.set()
+
+    def _drop_oldest(self):
+        for index, item in enumerate(self._queue):
+            if item[2]:
+                del self._queue[index]
+                self.dropped += 1
+                return
+
+    async def _drain(self):
+        delay = BROKER_RECONNECT_DELAY
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            channel, message, droppable = item = self._queue.popleft()
+            try:
+                await self._client.publish(channel, message)
+                delay = BROKER_RECONNECT_DELAY
+            except Exception as e:
+                log.warning("Error publishing to %s: %s; retrying in %.1fs", channel, e, delay)
+                # Keep its place so nothing is reordered or lost
+                self._queue.appendleft(item)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, BROKER_RECONNECT_MAX_DELAY)
+
+    async def _listen(self):
+        delay = BROKER_RECONNECT_DELAY
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    delay = BROKER_RECONNECT_DELAY
+                    if message["type"] != "message":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self._dispatch(channel, message["data"])
+            except Exception as e:
+                log.warning("Broker connection lost: %s; reconnecting in %.1fs", e, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BROKER_RECONNECT_MAX_DELAY)
+            try:
+                await self._pubsub.aclose()
+                await self._connect()
+            except Exception as e:
+                log.warning("Error reconnecting to broker: %s", e)
+                continue
+            self.reconnects += 1
+            log.info("Reconnected to broker at %s", self.url)
+            for callback in self._reconnect_handlers:
+                try:
+                    callback()
+                except Exception as e:
+                    log.warning("Error in broker reconnect handler: %s", e)
+
+
+def create_broker(url: str = BROKER_URL) -> Broker:
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    return InProcessBroker()
@@ -0,0 +1,153 @@
+import json
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from broker import WORKER_ID
+
+CALLS_CHANNEL = "calls"
+
+
+class Participant:
+    def __init__(self, user_id: str, language_code=None, voice_id=None):
+        self.user_id = user_id
+        self.language_code = language_code
+        self.voice_id = voice_id
+
+
+class Call:
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.started_at = time.time()
+        self.participants: Dict[str, Participant] = {}
+
+    def peers(self, user_id: str) -> List[Participant]:
+        return [p for uid, p in self.participants.items() if uid != user_id]
+
+
+class CallRegistry:
+    """Ongoing calls indexed by participant.
+
+    None of the methods await, so each transition is atomic on the event
+    loop: concurrent accept/end requests can't interleave halfway through.
+    With a broker attached, transitions are also published so every worker
+    keeps the same view of who is in which call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Call] = {}
+        self._by_user: Dict[str, Call] = {}
+        self._broker = None
+
+    async def attach_broker(self, broker):
+        self._broker = broker
+        if broker.remote:
+            await broker.subscribe(CALLS_CHANNEL, self._handle_event)
+
+    def _publish(self, op: str, **fields):
+        if self._broker is not None and self._broker.remote:
+            event = {"origin": WORKER_ID, "op": op, **fields}
+            self._broker.publish(CALLS_CHANNEL, json.dumps(event).encode())
+
+    def _handle_event(self, message: bytes):
+        event = json.loads(message)
+        if event["origin"] == WORKER_ID:
+            return
+        if event["op"] == "accept":
+            self._accept(event["caller_id"], event["recipient_id"], event["call_id"])
+        elif event["op"] == "leave":
+            self._leave(event["user_id"])
+        elif event["op"] == "end":
+            self._end_for(event["user_id"])
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __iter__(self):
+        return iter(list(self._calls.values()))
+
+    def __contains__(self, user_id):
+        return user_id in self._by_user
+
+    def __repr__(self):
+        return f"CallRegistry({[list(c.participants) for c in self._calls.values()]})"
+
+    def call_for(self, user_id: str) -> Optional[Call]:
+        return self._by_user.get(user_id)
+
+    def peers(self, user_id: str) -> List[Participant]:
+        call = self._by_user.get(user_id)
+        return call.peers(user_id) if call else []
+
+    def accept(self, caller_id: str, recipient_id: str) -> Call:
+        """Join recipient to the caller's call, starting one if needed.
+
+        Accepting twice is a no-op. A recipient already in another call
+        is moved out of it first.
+        """
+        call = self._accept(caller_id, recipient_id, uuid.uuid4().hex)
+        self._publish(
+            "accept",
+            caller_id=caller_id,
+            recipient_id=recipient_id,
+            call_id=call.call_id,
+        )
+        return call
+
+    def _accept(self, caller_id, recipient_id, call_id):
+        call = self._by_user.get(caller_id)
+        if call is None:
+            call = Call(call_id)
+            self._calls[call.call_id] = call
+            self._join(call, caller_id)
+        if self._by_user.get(recipient_id) is not call:
+            self._leave(recipient_id)
+            self._join(call, recipient_id)
+        return call
+
+    def _join(self, call: Call, user_id: str):
+        call.participants[user_id] = Participant(user_id)
+        self._by_user[user_id] = call
+
+    def update_participant(self, user_id: str, **fields):
+        call = self._by_user.get(user_id)
+        if call is None:
+            return
+        participant = call.participants[user_id]
+        for name, value in fields.items():
+            setattr(participant, name, value)
+
+    def leave(self, user_id: str) -> Optional[Call]:
+        """Remove one participant; the call ends when fewer than two remain."""
+        call = self._leave(user_id)
+        if call is not None:
+            self._publish("leave", user_id=user_id)
+        return call
+
+    def _leave(self, user_id):
+        call = self._by_user.pop(user_id, None)
+        if call is None:
+            return None
+        del call.participants[user_id]
+        if len(call.participants) < 2:
+            self._end(call)
+        return call
+
+    def end(self, user_id: str) -> Optional[Call]:
+        """End the whole call user_id is in, for every participant."""
+        call = self._end_for(user_id)
+        if call is not None:
+            self._publish("end", user_id=user_id)
+        return call
+
+    def _end_for(self, user_id):
+        call = self._by_user.get(user_id)
+        if call is not None:
+            self._end(call)
+        return call
+
+    def _end(self, call: Call):
+        self._calls.pop(call.call_id, None)
+        for uid in call.participants:
+            if self._by_user.get(uid) is call:
+                del self._by_user[uid]
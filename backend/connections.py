@@ -0,0 +1,311 @@
+import asyncio
+import base64
+import json
+import os
+from collections import deque
+from typing import Dict, Optional, Set
+
+from broker import WORKER_ID
+from metrics import outbound_dropped_messages, outbound_dropped_utterances
+
+# Audio chunks a listener may fall behind by before utterances are dropped
+OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "512"))
+
+
+class Connection:
+    """One outbound socket, drained by its own writer task.
+
+    Sends only enqueue, so a slow listener backs up its own queue instead
+    of stalling the sender. Signaling and audio control messages are never
+    dropped. Audio is bounded at max_queue chunks: past that, the oldest
+    queued utterance is dropped whole (its queued chunks and any still to
+    come) so the listener never gets an MP3 stream with holes in it. A
+    message's on_sent callback runs once it has been written to the socket.
+    """
+
+    def __init__(self, send_text, send_bytes, binary_audio=False, max_queue=OUTBOUND_QUEUE_SIZE):
+        self._send_text = send_text
+        self._send_bytes = send_bytes
+        self.binary_audio = binary_audio
+        self.max_queue = max_queue
+        # Audio chunks and whole utterances dropped for this listener
+        self.dropped = 0
+        self.dropped_utterances = 0
+        # (utterance or None for control, is_bytes, message, on_sent)
+        self._queue = deque()
+        self._ready = asyncio.Event()
+        self._audio_queued = 0
+        # Utterance that audio chunks are currently added to, and one
+        # whose remaining chunks are being discarded
+        self._utterance = 0
+        self._skipping = None
+        self._writer = asyncio.create_task(self._drain())
+
+    @classmethod
+    def for_starlette(cls, websocket, **kwargs):
+        return cls(websocket.send_text, websocket.send_bytes, **kwargs)
+
+    @classmethod
+    def for_websockets(cls, websocket, **kwargs):
+        return cls(websocket.send, websocket.send, **kwargs)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._writer.done()
+
+    def _enqueue(self, item):
+        if self.closed:
+            return
+        self._queue.append(item)
+        if item[0] is not None:
+            self._audio_queued += 1
+        self._ready.set()
+
+    def send_text(self, message: str, on_sent=None):
+        self._enqueue((None, False, message, on_sent))
+
+    def send_bytes(self, message: bytes, on_sent=None):
+        self._enqueue((None, True, message, on_sent))
+
+    def send_json(self, message: dict, on_sent=None):
+        self.send_text(json.dumps(message), on_sent)
+
+    def send_audio(self, chunk: bytes, on_sent=None):
+        """Queue one chunk of the current utterance, dropping whole utterances on overflow."""
+        utterance = self._utterance
+        if self._audio_queued >= self.max_queue and utterance != self._skipping:
+            self._drop_oldest_utterance()
+        if utterance == self._skipping:
+            self.dropped += 1
+            outbound_dropped_messages.inc()
+            return
+        if self.binary_audio:
+            # Raw MP3 bytes as a binary frame, no re-encoding
+            self._enqueue((utterance, True, chunk, on_sent))
+        else:
+            # Convert bytes to base64 to ensure safe transmission
+            message = {"type": "audio_chunk", "data": base64.b64encode(chunk).decode("utf-8")}
+            self._enqueue((utterance, False, json.dumps(message), on_sent))
+
+    def end_audio(self, message: dict):
+        """Send an end-of-stream control message; later audio starts a new utterance."""
+        self.send_json(message)
+        self._utterance += 1
+
+    def _drop_oldest_utterance(self):
+        oldest = next(item[0] for item in self._queue if item[0] is not None)
+        kept = deque(item for item in self._queue if item[0] != oldest)
+        removed = len(self._queue) - len(kept)
+        self._queue = kept
+        self._audio_queued -= removed
+        self.dropped += removed
+        self.dropped_utterances += 1
+        outbound_dropped_messages.inc(removed)
+        outbound_dropped_utterances.inc()
+        if oldest == self._utterance:
+            # Its remaining chunks would only play as a fragment
+            self._skipping = oldest
+
+    async def _drain(self):
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            utterance, is_bytes, message, on_sent = self._queue.popleft()
+            if utterance is not None:
+                self._audio_queued -= 1
+            try:
+                if is_bytes:
+                    await self._send_bytes(message)
+                else:
+                    await self._send_text(message)
+            except Exception as e:
+                print(f"Error sending to websocket: {e}")
+                return
+            if on_sent is not None:
+                on_sent()
+
+    def close(self):
+        self._writer.cancel()
+
+
+# Relay message kinds, sent as the first byte of a broker message
+RELAY_SIGNAL = b"s"
+RELAY_AUDIO = b"a"
+RELAY_AUDIO_CONTROL = b"c"
+
+# Workers announce which users they hold here
+PRESENCE_CHANNEL = "presence"
+
+
+class ConnectionRegistry:
+    """Signaling (/ws/start) and audio (:8765) sockets per user, kept apart.
+
+    Messages for a user with no socket in this process are relayed through
+    the attached broker to whichever worker holds it. Workers publish who
+    they hold on the presence channel, so a user connected nowhere is
+    reported as such instead of being sent messages nobody receives.
+    """
+
+    def __init__(self):
+        self.signaling: Dict[str, Connection] = {}
+        self.audio: Dict[str, Connection] = {}
+        # Users held by other workers, with the workers holding them
+        self.remote: Dict[str, Set[str]] = {}
+        self._broker = None
+
+    async def attach_broker(self, broker):
+        self._broker = broker
+        if broker.remote:
+            for user_id in self.signaling.keys() | self.audio.keys():
+                await broker.subscribe(f"user:{user_id}", self._relay_handler(user_id))
+            await broker.subscribe(PRESENCE_CHANNEL, self._handle_presence)
+            broker.on_reconnect(self._sync_presence)
+            self._sync_presence()
+
+    def _publish_presence(self, op: str, users=()):
+        event = {"origin": WORKER_ID, "op": op, "users": list(users)}
+        self._broker.publish(PRESENCE_CHANNEL, json.dumps(event).encode())
+
+    def _sync_presence(self):
+        # Ask the other workers who they hold, and tell them who we hold
+        self._publish_presence("hello")
+        self._publish_presence("online", self.signaling.keys() | self.audio.keys())
+
+    def _handle_presence(self, message: bytes):
+        event = json.loads(message)
+        origin = event["origin"]
+        if origin == WORKER_ID:
+            return
+        if event["op"] == "hello":
+            self._publish_presence("online", self.signaling.keys() | self.audio.keys())
+        elif event["op"] == "online":
+            for user_id in event["users"]:
+                self.remote.setdefault(user_id, set()).add(origin)
+        elif event["op"] == "offline":
+            for user_id in event["users"]:
+                workers = self.remote.get(user_id)
+                if workers is not None:
+                    workers.discard(origin)
+                    if not workers:
+                        del self.remote[user_id]
+
+    def _relay_handler(self, user_id):
+        def handle(message: bytes):
+            kind, payload = message[:1], message[1:]
+            if kind == RELAY_SIGNAL:
+                self._signal_local(user_id, json.loads(payload))
+            elif kind == RELAY_AUDIO:
+                self._audio_local(user_id, payload)
+            elif kind == RELAY_AUDIO_CONTROL:
+                self._audio_control_local(user_id, json.loads(payload))
+
+        return handle
+
+    def _relay(self, user_id: str, kind: bytes, payload: bytes) -> bool:
+        if self._broker is None or not self._broker.remote or user_id not in self.remote:
+            return False
+        # Only audio may be shed if the broker falls behind
+        self._broker.publish(f"user:{user_id}", kind + payload, droppable=kind == RELAY_AUDIO)
+        return True
+
+    def _watch(self, user_id: str):
+        if self._broker is not None and self._broker.remote:
+            asyncio.create_task(
+                self._broker.subscribe(f"user:{user_id}", self._relay_handler(user_id))
+            )
+            self._publish_presence("online", [user_id])
+
+    def _unwatch(self, user_id: str):
+        if self._broker is not None and self._broker.remote and user_id not in self:
+            asyncio.create_task(self._broker.unsubscribe(f"user:{user_id}"))
+            self._publish_presence("offline", [user_id])
+
+    def reachable(self, user_id: str) -> bool:
+        """Whether user_id has a socket in this or any other worker."""
+        return user_id in self or user_id in self.remote
+
+    def __contains__(self, user_id):
+        return user_id in self.signaling or user_id in self.audio
+
+    def __len__(self):
+        return len(self.signaling.keys() | self.audio.keys())
+
+    def __repr__(self):
+        return f"ConnectionRegistry(signaling={list(self.signaling)}, audio={list(self.audio)})"
+
+    def register_signaling(self, user_id: str, connection: Connection):
+        self._replace(self.signaling, user_id, connection)
+
+    def register_audio(self, user_id: str, connection: Connection):
+        self._replace(self.audio, user_id, connection)
+
+    def _replace(self, channel, user_id, connection):
+        if user_id not in self:
+            self._watch(user_id)
+        previous = channel.get(user_id)
+        if previous is not None and previous is not connection:
+            previous.close()
+        channel[user_id] = connection
+
+    def unregister_signaling(self, user_id: str, connection: Connection):
+        self._remove(self.signaling, user_id, connection)
+
+    def unregister_audio(self, user_id: str, connection: Connection):
+        self._remove(self.audio, user_id, connection)
+
+    def _remove(self, channel, user_id, connection):
+        # Only drop the entry if a newer socket hasn't replaced it
+        if channel.get(user_id) is connection:
+            del channel[user_id]
+            self._unwatch(user_id)
+        connection.close()
+
+    def send_signal(self, user_id: str, message: dict) -> bool:
+        if self._signal_local(user_id, message):
+            return True
+        return self._relay(user_id, RELAY_SIGNAL, json.dumps(message).encode())
+
+    def send_audio(self, user_id: str, chunk: bytes, on_sent=None) -> bool:
+        """Queue chunk for user_id; on_sent runs once it's on the wire (or handed to the broker)."""
+        if self._audio_local(user_id, chunk, on_sent):
+            return True
+        relayed = self._relay(user_id, RELAY_AUDIO, bytes(chunk))
+        if relayed and on_sent is not None:
+            on_sent()
+        return relayed
+
+    def send_audio_control(self, user_id: str, message: dict) -> bool:
+        """Send an end-of-stream control message; unlike audio it is never dropped."""
+        if self._audio_control_local(user_id, message):
+            return True
+        return self._relay(user_id, RELAY_AUDIO_CONTROL, json.dumps(message).encode())
+
+    def _signal_local(self, user_id: str, message: dict) -> bool:
+        connection = self.signaling.get(user_id)
+        if connection is None:
+            return False
+        connection.send_json(message)
+        return True
+
+    def _audio_connection(self, user_id: str) -> Optional[Connection]:
+        # Prefer a dedicated audio socket, fall back to the signaling one
+        return self.audio.get(user_id) or self.signaling.get(user_id)
+
+    def _audio_local(self, user_id: str, chunk: bytes, on_sent=None) -> bool:
+        connection = self._audio_connection(user_id)
+        if connection is None:
+            return False
+        connection.send_audio(chunk, on_sent)
+        return True
+
+    def _audio_control_local(self, user_id: str, message: dict) -> bool:
+        connection = self._audio_connection(user_id)
+        if connection is None:
+            return False
+        connection.end_audio(message)
+        return True
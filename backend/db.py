@@ -0,0 +1,93 @@
+import os
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import create_async_engine
+
+load_dotenv()
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def async_db_url(url: str) -> str:
+    """Map a sync DB_URL onto its async driver (asyncpg for Postgres, aiosqlite for SQLite)."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect in ("postgres", "postgresql"):
+        # asyncpg spells libpq's sslmode as ssl
+        rest = rest.replace("sslmode=", "ssl=")
+        return f"postgresql+asyncpg{sep}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+def create_engine_from_url(url: str):
+    url = async_db_url(url)
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool class; queue pool options don't apply
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        # asyncpg prepares each statement once per connection and reuses it
+        connect_args={"prepared_statement_cache_size": 256},
+    )
+
+
+class PoolStats:
+    """Time spent waiting for a pooled connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self, engine) -> dict:
+        pool = engine.pool
+        status = {
+            "checkouts": self.checkouts,
+            "avg_wait_seconds": (
+                self.total_wait / self.checkouts if self.checkouts else 0.0
+            ),
+            "max_wait_seconds": self.max_wait,
+        }
+        if hasattr(pool, "checkedout"):
+            status.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                }
+            )
+        return status
+
+
+engine = create_engine_from_url(os.getenv("DB_URL", ""))
+pool_stats = PoolStats()
+
+
+@asynccontextmanager
+async def db_connection():
+    """Check out a pooled async connection, recording how long the checkout took."""
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        pool_stats.record(time.perf_counter() - started)
+        yield conn
+
+
+def pool_status() -> dict:
+    return pool_stats.snapshot(engine)
@@ -0,0 +1,99 @@
+import importlib.util
+import os
+
+OPENAI_ORGANIZATION = "org-wTKqrfyGm4y0SrDgy5jzh9SH"
+OPENAI_PROJECT = "proj_TKDNPdEkva9jDdK19AGEN8w8"
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+# httpx only speaks HTTP/2 when the h2 package is installed
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+class HTTPClients:
+    """Application-wide HTTP clients with pooled keep-alive connections.
+
+    Each client is created on first use and then shared by every request
+    and utterance, so TLS and connection setup happen once per upstream
+    host instead of once per call. The OpenAI SDK, httpx and aiohttp are
+    only imported then, so neither importing this module nor starting the
+    app loads them or touches the network. close() runs at shutdown.
+    """
+
+    def __init__(self):
+        self._openai = None
+        self._openai_sync = None
+        self._session = None
+
+    def _create_openai(self):
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            http2=HTTP2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        return AsyncOpenAI(
+            organization=OPENAI_ORGANIZATION,
+            project=OPENAI_PROJECT,
+            http_client=http_client,
+        )
+
+    def _create_sync_openai(self):
+        from openai import OpenAI
+
+        return OpenAI(organization=OPENAI_ORGANIZATION, project=OPENAI_PROJECT)
+
+    def _create_session(self):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT
+            ),
+        )
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            self._openai = self._create_openai()
+        return self._openai
+
+    @property
+    def openai_sync(self):
+        """Blocking client for code that runs outside the event loop."""
+        if self._openai_sync is None:
+            self._openai_sync = self._create_sync_openai()
+        return self._openai_sync
+
+    @property
+    def session(self):
+        """aiohttp session for the ElevenLabs REST API."""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def close(self):
+        if self._openai is not None:
+            await self._openai.close()
+            self._openai = None
+        if self._openai_sync is not None:
+            self._openai_sync.close()
+            self._openai_sync = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
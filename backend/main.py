@@ -1,18 +1,48 @@
-from services.speech_to_text.speechmatics_client import SpeechmaticsClient
-from text_translate import translate_text, translate_text_stream, start_websocket_server
-from fastapi import FastAPI, WebSocket, UploadFile, File, Form, HTTPException
+from services.speech_to_text.engine import create_stt_engine
+from text_translate import translate_text_stream, start_websocket_server
+from fastapi import (
+    FastAPI,
+    WebSocket,
+    WebSocketDisconnect,
+    UploadFile,
+    File,
+    Form,
+    HTTPException,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
-from datetime import datetime
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-import numpy as np
-import aiohttp
 import asyncio
 import os
-import io
-import websockets
-from shared_state import connected_clients, ongoing_calls
+import threading
+from shared_state import (
+    connected_clients,
+    ongoing_calls,
+    broker,
+    tts_sessions,
+    http_clients,
+)
+from connections import Connection
+from audio_processor import AudioProcessor, parse_audio_frame
+from audio_format import AudioDecoder, bytes_per_sample, float32_to_pcm
+from db import DB_MAX_OVERFLOW, db_connection, pool_status
+from profile_cache import get_user_profile, profile_cache
+from translation_cache import translation_cache
+from audio_cache import audio_cache
+from metrics import (
+    audio_dropped_bytes,
+    loop_lag,
+    metric,
+    outbound_dropped_messages,
+    outbound_dropped_utterances,
+    readiness,
+    upstream_latency,
+    ws_sessions,
+)
+from tracing import UtteranceTrace, log, stage_stats
+from vad import VAD_ENABLED, VoiceActivityDetector
 import base64
 import json
 
@@ -24,10 +54,19 @@ async def lifespan(app: FastAPI):
     # Startup
     global websocket_server
     websocket_server = await start_websocket_server()
+    loop_lag.start()
+    await broker.start()
+    await connected_clients.attach_broker(broker)
+    await ongoing_calls.attach_broker(broker)
 
     yield
 
     # Shutdown
+    loop_lag.stop()
+    await tts_sessions.close()
+    await http_clients.close()
+    translation_cache.close()
+    await broker.close()
     if websocket_server:
         websocket_server.close()
         await websocket_server.wait_closed()
@@ -65,47 +104,23 @@ async def add_websocket_cors_headers(request, call_next):
     return response
 
 
-load_dotenv()
-
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
-# Database setup
-DB_URL = os.getenv("DB_URL")
-engine = create_engine(DB_URL)
+# "utterance" waits for the client's terminal message before translating;
+# "incremental" translates each finished sentence as soon as it's transcribed
+TRANSLATION_MODE = os.getenv("TRANSLATION_MODE", "utterance")
+SENTENCE_ENDINGS = (".", "?", "!", "。", "？", "！")
+# A transcription stream that fails is reopened after an exponential
+# backoff; a session whose stream fails this many times in a row, with no
+# transcript in between, is closed
+STT_MAX_RECONNECTS = int(os.getenv("STT_MAX_RECONNECTS", "5"))
+STT_RECONNECT_DELAY = float(os.getenv("STT_RECONNECT_DELAY", "0.5"))
+STT_RECONNECT_MAX_DELAY = float(os.getenv("STT_RECONNECT_MAX_DELAY", "8"))
 
 # Global variable for websocket server
 websocket_server = None
 
 
-class AudioProcessor:
-    def __init__(self):
-        self.wave_data = bytearray()
-        self.read_offset = 0
-
-    async def read(self, chunk_size):
-        while self.read_offset + chunk_size > len(self.wave_data):
-            await asyncio.sleep(0.001)
-        new_offset = self.read_offset + chunk_size
-        data = self.wave_data[self.read_offset : new_offset]
-        self.read_offset = new_offset
-        return data
-
-    def clear_buffer(self):
-        self.wave_data = bytearray()
-        self.read_offset = 0
-
-    def write_audio(self, data):
-        try:
-            # Data is already in float32 PCM format, just extend the buffer
-            self.wave_data.extend(data)
-        except Exception as e:
-            print(f"Error handling audio data: {str(e)}")
-            import traceback
-
-            print(traceback.format_exc())
-        return
-
-
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     # Extract query parameters
@@ -113,135 +128,258 @@ async def websocket_endpoint(websocket: WebSocket):
     user_id = query_params.get("user_id")
     voice_id = None
     source_language_code = None
-    target_language_code = None
     try:
-        with engine.connect() as conn:
-            query = text(
-                """
-                SELECT external_id
-                FROM voices
-                WHERE user_id = :user_id
-                ORDER BY created_at DESC
-                LIMIT 1
-            """
-            )
-            result = conn.execute(query, {"user_id": user_id})
-            voice_record = result.fetchone()
-            if voice_record:
-                voice_id = voice_record.external_id
-
-            query = text(
-                """
-                SELECT language_code
-                FROM users
-                WHERE id = :user_id
-            """
-            )
-            result = conn.execute(query, {"user_id": user_id})
-            source_language_code = result.fetchone().language_code
+        profile = await get_user_profile(user_id)
+        if profile["voice"]:
+            voice_id = profile["voice"]["external_id"]
+        source_language_code = profile["language_code"]
+        ongoing_calls.update_participant(
+            user_id, language_code=source_language_code, voice_id=voice_id
+        )
     except Exception as e:
         print(f"Error fetching voice ID: {e}")
 
     print(f"User ID: {user_id}")
     print(f"Language code: {source_language_code}")
 
-    buffer = []
+    mode = query_params.get("mode", TRANSLATION_MODE)
+    incremental = mode == "incremental"
+    # With server-side VAD, silence is dropped here and end of speech is
+    # detected without waiting for the client's terminal frame
+    vad = None
+    if query_params.get("vad", "1" if VAD_ENABLED else "0") == "1":
+        vad = VoiceActivityDetector(sample_rate=16000)
+
+    # Wire format the client negotiated; audio is converted to what the
+    # STT engine reads
+    try:
+        decoder = AudioDecoder(
+            encoding=query_params.get("encoding", "pcm_f32le"),
+            sample_rate=int(query_params.get("sample_rate", 16000)),
+            target_rate=16000,
+        )
+    except (ValueError, ImportError) as e:
+        await websocket.accept()
+        await websocket.close(code=4000, reason=str(e))
+        return
+
+    # (text, trace) of finished transcript segments, in order; a None text
+    # marks the end of an utterance
+    segments = asyncio.Queue()
     await websocket.accept()
+    session_key = id(websocket)
 
-    audio_processor = AudioProcessor()
+    audio_processor = None
     transcription_task = None  # Initialize as None
+    segments_task = None
+    # end_utterance() tasks still waiting for their final transcripts
+    utterance_tasks = set()
+    speaking = False
+    # Stage timings of the utterance currently being spoken
+    trace = None
+    # Consecutive transcription streams that failed without a transcript
+    stt_failures = 0
+    close_code = 1000
 
     def handle_transcript(text):
-        print(f"Received transcript: {text}")
-        print(f"Language code: {source_language_code}")
-        buffer.append(text)
-        print(f"Buffer: {buffer}")
-
-    client = SpeechmaticsClient(
-        api_key=os.getenv("SPEECHMATICS_API_KEY"),
-        language=source_language_code,
-        sample_rate=16000,
-        on_transcript=handle_transcript,
-    )
+        nonlocal stt_failures
+        stt_failures = 0
+        log.debug("Received transcript (%s): %s", source_language_code, text)
+        # Engines send empty finals during silence and for the padding
+        # after an utterance; they don't count as transcribing it
+        if trace is not None and text:
+            trace.mark("first_transcript")
+            trace.mark("final_transcript", first_only=False)
+        segments.put_nowait((text, trace))
+
+    async def translate_to_peers(original_text, trace=None):
+        peers = ongoing_calls.peers(user_id)
+        for peer in peers:
+            # Calls accepted on another worker arrive without metadata
+            if peer.language_code is None:
+                profile = await get_user_profile(peer.user_id)
+                peer.language_code = profile and profile["language_code"]
+        # Translate once per listener, into each listener's language
+        await asyncio.gather(
+            *(
+                translate_text_stream(
+                    original_text,
+                    source_language_code,
+                    peer.language_code,
+                    broadcast=True,
+                    voice_id=voice_id,
+                    recipient_id=peer.user_id,
+                    trace=trace,
+                )
+                for peer in peers
+            )
+        )
+
+    async def translate_segments():
+        # A single consumer keeps this speaker's turns in order and off the
+        # receive loop, so the next utterance's audio is read while the
+        # previous one is still being translated and spoken. Incremental
+        # mode translates each finished sentence, utterance mode the whole
+        # utterance once it has ended.
+        pending = []
+        while True:
+            text, segment_trace = await segments.get()
+            if text:
+                pending.append(text)
+            elif text is None and not pending and not incremental:
+                log.debug("Utterance produced no transcript, skipping")
+            sentence_done = incremental and text and text.rstrip().endswith(SENTENCE_ENDINGS)
+            if pending and (text is None or sentence_done):
+                try:
+                    await translate_to_peers(" ".join(pending), segment_trace)
+                except Exception as e:
+                    print(f"Error translating segment: {e}")
+                pending = []
+            # Utterances with nothing transcribed would only skew the stages
+            if (
+                text is None
+                and segment_trace is not None
+                and "final_transcript" in segment_trace.marks
+            ):
+                segment_trace.finish()
+
+    async def end_utterance(position, utterance_trace):
+        # Let the stream deliver its final transcripts before marking the end
+        if not await client.wait_transcribed(position):
+            print("Timed out waiting for final transcripts")
+        segments.put_nowait((None, utterance_trace))
+
+    def start_transcription(delay=0.0):
+        processor = AudioProcessor()
+
+        async def transcribe():
+            if delay:
+                # Audio written meanwhile waits in the processor
+                await asyncio.sleep(delay)
+            await client.transcribe_audio_stream(processor)
+
+        return processor, asyncio.create_task(transcribe())
+
+    def restart_transcription():
+        nonlocal audio_processor, transcription_task, stt_failures, close_code
+        error = None if transcription_task.cancelled() else transcription_task.exception()
+        if error is None:
+            # The realtime session dropped (e.g. server idle timeout)
+            print("Transcription stream ended, reconnecting")
+            stt_failures = 0
+        else:
+            stt_failures += 1
+            print(
+                f"Transcription stream failed ({stt_failures}/{STT_MAX_RECONNECTS}): {error!r}"
+            )
+            if stt_failures >= STT_MAX_RECONNECTS:
+                close_code = 1011
+                raise RuntimeError("Transcription unavailable, giving up on the session")
+        delay = 0.0
+        if stt_failures:
+            delay = min(
+                STT_RECONNECT_DELAY * 2 ** (stt_failures - 1), STT_RECONNECT_MAX_DELAY
+            )
+        audio_processor.close()
+        audio_processor, transcription_task = start_transcription(delay)
+
+    def write_audio(pcm):
+        nonlocal speaking, trace
+        if not speaking:
+            speaking = True
+            trace = UtteranceTrace(user_id, mode)
+            trace.mark("audio_ingest")
+        if transcription_task.done():
+            restart_transcription()
+        audio_processor.write_audio(pcm)
 
     try:
+        client = create_stt_engine(
+            language=source_language_code,
+            sample_rate=16000,
+            on_transcript=handle_transcript,
+            engine=query_params.get("stt_engine"),
+        )
+    except ValueError as e:
+        # Unknown ?stt_engine=
+        await websocket.close(code=4000, reason=str(e))
+        return
+    except ImportError as e:
+        print(f"STT engine unavailable: {e}")
+        await websocket.close(code=1011, reason="Speech-to-text engine unavailable")
+        return
+
+    try:
+        # Registered only once the session can run; always removed below
+        ws_sessions[session_key] = lambda: audio_processor
         print("Starting transcription process")
 
-        # Start initial transcription task
-        transcription_task = asyncio.create_task(
-            client.transcribe_audio_stream(audio_processor)
-        )
+        # One transcription stream for the whole session; utterances are
+        # separated by flushing it rather than by reconnecting
+        audio_processor, transcription_task = start_transcription()
+        segments_task = asyncio.create_task(translate_segments())
 
         print("ongoing calls: ", ongoing_calls)
 
-        id_1, id_2 = next(
-            (
-                call
-                for call in ongoing_calls
-                if call[0] == user_id or call[1] == user_id
-            ),
-            None,
-        )
-        recipient_id = id_1 if id_1 != user_id else id_2
-        print("recipient id: ", recipient_id)
-        try:
-            with engine.connect() as conn:
-                query = text(
-                    """
-                    SELECT language_code
-                    FROM users
-                    WHERE id = :recipient_id
-                """
-                )
-                result = conn.execute(query, {"recipient_id": recipient_id})
-                target_language_code = result.fetchone().language_code
-        except Exception as e:
-            print(f"Error fetching voice ID: {e}")
+        call = ongoing_calls.call_for(user_id)
+        print("call id: ", call.call_id if call else None)
+
+        # Without VAD, audio already in the engine's encoding and rate goes
+        # straight from the frame into the ring, with no decode or copy
+        passthrough = vad is None and decoder.passthrough(client.encoding)
+        sample_size = bytes_per_sample(client.encoding)
 
+        expected_sequence = None
         while True:
             try:
-                message = await websocket.receive_text()
-                message_data = json.loads(message)
-                audio_base64 = message_data.get("audio", "")
-                data = base64.b64decode(audio_base64)
-                terminal = message_data.get("terminal", False)
-
-                if terminal:
-                    print(f"Terminal chunk received: {buffer}")
-                    cleaned_buffer = [item for item in buffer if len(item) > 0]
-                    if len(cleaned_buffer) == 0:
-                        print("Buffer is empty, skipping")
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if message.get("bytes") is not None:
+                    # Binary frame: header + audio in the negotiated encoding, no base64
+                    terminal, sequence, data = parse_audio_frame(message["bytes"])
+                    if expected_sequence is not None and sequence != expected_sequence:
+                        print(
+                            f"Audio frame gap: expected {expected_sequence}, got {sequence}"
+                        )
+                    expected_sequence = sequence + 1
+                else:
+                    # Legacy JSON frame with base64 audio
+                    message_data = json.loads(message["text"])
+                    audio_base64 = message_data.get("audio", "")
+                    data = base64.b64decode(audio_base64)
+                    terminal = message_data.get("terminal", False)
+
+                if passthrough and not terminal and len(data) % sample_size == 0:
+                    write_audio(data)
+                    continue
+
+                samples = decoder.decode(data)
+                if vad is not None and not terminal:
+                    segment = vad.process(samples)
+                    if segment.audio.size:
+                        write_audio(float32_to_pcm(segment.audio, client.encoding))
+                    if not segment.speech_ended:
                         continue
-                    # Cancel existing transcription task
-                    if transcription_task:
-                        transcription_task.cancel()
-                        try:
-                            await transcription_task
-                        except asyncio.CancelledError:
-                            print("Transcription task cancelled")
-
-                    print("buffer: ", cleaned_buffer)
-                    await translate_text_stream(
-                        " ".join(cleaned_buffer),
-                        source_language_code,
-                        target_language_code,
-                        broadcast=True,
-                        voice_id=voice_id,
-                        recipient_id=recipient_id,
-                    )
-                    buffer = []
-                    audio_processor.clear_buffer()
-                    print(
-                        "Creating new transcription task, audio processor: ",
-                        audio_processor,
-                    )
+                    terminal = True
+                elif vad is not None and terminal and not vad.end_speech():
+                    # The server already ended this utterance
+                    continue
 
-                    # Start new transcription task
-                    transcription_task = asyncio.create_task(
-                        client.transcribe_audio_stream(audio_processor)
-                    )
+                if terminal and trace is not None:
+                    trace.mark("speech_end")
+
+                if terminal:
+                    log.debug("Terminal chunk received")
+                    speaking = False
+                    # Translation happens on segments_task; keep reading audio
+                    position = client.mark_utterance_end(audio_processor)
+                    task = asyncio.create_task(end_utterance(position, trace))
+                    utterance_tasks.add(task)
+                    task.add_done_callback(utterance_tasks.discard)
                 else:
-                    audio_processor.write_audio(data)
+                    write_audio(float32_to_pcm(samples, client.encoding))
             except Exception as ws_error:
                 print(f"WebSocket error: {ws_error}")
                 break
@@ -249,21 +387,28 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"Error in main loop: {e}")
     finally:
-        # Cancel transcription task if it exists
-        if "transcription_task" in locals():
-            transcription_task.cancel()
+        ws_sessions.pop(session_key, None)
+        if segments_task:
+            segments_task.cancel()
+        for task in utterance_tasks:
+            task.cancel()
+        if vad is not None:
+            print(f"[vad] {vad.stats()}")
+
+        # Closing the buffer ends the audio stream, which lets the
+        # transcription client finish its session cleanly
+        if audio_processor:
+            audio_processor.close()
+        if transcription_task:
             try:
-                await transcription_task
-            except asyncio.CancelledError:
-                print("Transcription task cancelled")
-
-        # Clean up audio processor
-        if "audio_processor" in locals():
-            audio_processor.clear_buffer()
+                await asyncio.wait_for(transcription_task, timeout=5)
+            except Exception as e:
+                print(f"Transcription stream did not shut down cleanly: {e!r}")
 
         # Close websocket connection explicitly
         try:
-            await websocket.close(code=1000)  # 1000 is normal closure
+            # 1000 is normal closure, 1011 an internal error
+            await websocket.close(code=close_code)
         except Exception as e:
             print(f"Error closing websocket: {e}")
 
@@ -284,7 +429,10 @@ async def start_websocket_endpoint(websocket: WebSocket):
 
     try:
         # Add this client to connected clients
-        connected_clients[user_id] = websocket
+        connection = Connection.for_starlette(
+            websocket, binary_audio=query_params.get("audio_format") == "binary"
+        )
+        connected_clients.register_signaling(user_id, connection)
         print(f"User {user_id} connected to call websocket")
         print("connected clients: ", connected_clients)
 
@@ -296,44 +444,134 @@ async def start_websocket_endpoint(websocket: WebSocket):
 
                 if data.get("type") == "call_request":
                     recipient_id = data.get("recipient_id")
-                    if recipient_id in connected_clients:
-                        # Forward call request to recipient
-                        await connected_clients[recipient_id].send_json(
-                            {"type": "incoming_call", "caller_id": user_id}
-                        )
+                    # Forward call request to recipient
+                    connected_clients.send_signal(
+                        recipient_id, {"type": "incoming_call", "caller_id": user_id}
+                    )
 
                 elif data.get("type") == "call_accepted":
                     caller_id = data.get("caller_id")
-                    if caller_id in connected_clients:
-                        # Notify caller that call was accepted
-                        await connected_clients[caller_id].send_json(
-                            {"type": "call_accepted", "recipient_id": user_id}
-                        )
+                    # Notify caller that call was accepted
+                    connected_clients.send_signal(
+                        caller_id, {"type": "call_accepted", "recipient_id": user_id}
+                    )
                 elif data.get("type") == "call_ended":
                     caller_id = data.get("caller_id")
-                    if caller_id in connected_clients:
-                        # Notify caller that call was accepted
-                        await connected_clients[caller_id].send_json(
-                            {"type": "call_ended"}
-                        )
+                    # Notify caller that call was ended
+                    connected_clients.send_signal(caller_id, {"type": "call_ended"})
                     recipient_id = data.get("recipient_id")
-                    if recipient_id in connected_clients:
-                        # Notify recipient that call was ended
-                        await connected_clients[recipient_id].send_json(
-                            {"type": "call_ended"}
-                        )
+                    # Notify recipient that call was ended
+                    connected_clients.send_signal(recipient_id, {"type": "call_ended"})
 
-            except websockets.exceptions.ConnectionClosed:
+            except WebSocketDisconnect:
                 break
 
     except Exception as e:
         print(f"Error in call websocket: {e}")
     finally:
-        if user_id in connected_clients:
-            del connected_clients[user_id]
+        if "connection" in locals():
+            connected_clients.unregister_signaling(user_id, connection)
         print(f"User {user_id} disconnected from call websocket")
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of this worker's load and latency."""
+    processors = [get() for get in list(ws_sessions.values())]
+    processors = [processor for processor in processors if processor is not None]
+    connections = list(connected_clients.signaling.values()) + list(
+        connected_clients.audio.values()
+    )
+    pool = pool_status()
+    caches = {
+        "profile": profile_cache.stats(),
+        "translation": translation_cache.stats(),
+        "audio": audio_cache.stats(),
+    }
+    stages = stage_stats.percentiles()
+
+    lines = []
+    lines += metric("ws_sessions_active", "gauge", "Open /ws audio sessions", len(ws_sessions))
+    lines += metric(
+        "audio_buffer_bytes",
+        "gauge",
+        "Audio buffered for STT across sessions",
+        sum(processor.available for processor in processors),
+    )
+    lines += audio_dropped_bytes.render()
+    lines += metric(
+        "connected_clients",
+        "gauge",
+        "Registered client sockets by channel",
+        [
+            (("signaling",), len(connected_clients.signaling)),
+            (("audio",), len(connected_clients.audio)),
+        ],
+        ("channel",),
+    )
+    lines += metric(
+        "outbound_queue_messages",
+        "gauge",
+        "Messages waiting in client send queues",
+        sum(connection.queued for connection in connections),
+    )
+    lines += outbound_dropped_messages.render()
+    lines += outbound_dropped_utterances.render()
+    lines += metric("ongoing_calls", "gauge", "Calls in progress", len(ongoing_calls))
+    lines += metric(
+        "tts_connections", "gauge", "Warm ElevenLabs connections", len(tts_sessions.connections)
+    )
+    lines += metric("threads", "gauge", "Live threads in this process", threading.active_count())
+    lines += metric("event_loop_lag_last_seconds", "gauge", "Most recent event loop lag", loop_lag.lag)
+    lines += loop_lag.histogram.render()
+    if "size" in pool:
+        lines += metric("db_pool_size", "gauge", "Database pool size", pool["size"])
+        lines += metric(
+            "db_pool_checked_out", "gauge", "Database connections in use", pool["checked_out"]
+        )
+    lines += metric("db_checkouts_total", "counter", "Database connection checkouts", pool["checkouts"])
+    lines += metric(
+        "db_checkout_wait_max_seconds",
+        "gauge",
+        "Longest wait for a database connection",
+        pool["max_wait_seconds"],
+    )
+    for name, kind, key in (
+        ("cache_hits_total", "counter", "hits"),
+        ("cache_misses_total", "counter", "misses"),
+        ("cache_entries", "gauge", "entries"),
+    ):
+        lines += metric(
+            name,
+            kind,
+            f"Cache {key}",
+            [((cache,), stats[key]) for cache, stats in caches.items()],
+            ("cache",),
+        )
+    lines += upstream_latency.render()
+    lines += metric(
+        "pipeline_stage_seconds",
+        "gauge",
+        "Seconds from the start of an utterance to each pipeline stage",
+        [
+            ((stage, quantile), summary[key])
+            for stage, summary in stages.items()
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"))
+        ],
+        ("stage", "quantile"),
+    )
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 while this worker is saturated."""
+    reasons = readiness(pool_status(), DB_MAX_OVERFLOW)
+    if reasons:
+        return JSONResponse({"ready": False, "reasons": reasons}, status_code=503)
+    return {"ready": True}
+
+
 @app.get("/")
 async def root():
     return {"message": "Audio processing server is running"}
@@ -346,6 +584,8 @@ async def create_voice(
     audio_file: UploadFile = File(...),
 ):
     print(voice_name, audio_file)
+    import aiohttp
+
     try:
         content = await audio_file.read()
 
@@ -360,41 +600,41 @@ async def create_voice(
         )
 
         # Make request to ElevenLabs API
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.elevenlabs.io/v1/voices/add",
-                headers={"xi-api-key": ELEVENLABS_API_KEY},
-                data=form_data,
-            ) as response:
-                if response.status != 200:
-                    error_detail = await response.text()
-                    return {"error": f"ElevenLabs API error: {error_detail}"}
-
-                result = await response.json()
-                voice_id = result.get("voice_id")  # Get the voice ID from ElevenLabs
-                print(voice_id)
-
-                with engine.connect() as conn:
-                    query = text(
-                        """
-                        INSERT INTO voices (external_id, user_id)
-                        VALUES (:external_id, :user_id)
-                        RETURNING id
+        async with http_clients.session.post(
+            "https://api.elevenlabs.io/v1/voices/add",
+            headers={"xi-api-key": ELEVENLABS_API_KEY},
+            data=form_data,
+        ) as response:
+            if response.status != 200:
+                error_detail = await response.text()
+                return {"error": f"ElevenLabs API error: {error_detail}"}
+
+            result = await response.json()
+            voice_id = result.get("voice_id")  # Get the voice ID from ElevenLabs
+            print(voice_id)
+
+            async with db_connection() as conn:
+                query = text(
                     """
-                    )
-                    db_result = conn.execute(
-                        query,
-                        {
-                            "external_id": voice_id,
-                            "user_id": user_id,
-                        },
-                    )
-                    conn.commit()
+                    INSERT INTO voices (external_id, user_id)
+                    VALUES (:external_id, :user_id)
+                    RETURNING id
+                """
+                )
+                db_result = await conn.execute(
+                    query,
+                    {
+                        "external_id": voice_id,
+                        "user_id": user_id,
+                    },
+                )
+                await conn.commit()
+            profile_cache.invalidate(user_id)
 
-                return {
-                    "voice_id": voice_id,
-                    "message": "Voice created and stored successfully",
-                }
+            return {
+                "voice_id": voice_id,
+                "message": "Voice created and stored successfully",
+            }
 
     except Exception as e:
         return {"error": str(e)}
@@ -409,7 +649,10 @@ async def end_call(data: dict):
         if not caller_id or not recipient_id:
             raise HTTPException(status_code=400, detail="Missing user IDs")
 
-        ongoing_calls.remove((caller_id, recipient_id))
+        call = ongoing_calls.end(caller_id)
+        participants = {caller_id, recipient_id}
+        if call:
+            participants.update(call.participants)
 
         end_signal = {
             "type": "call_ended",
@@ -419,10 +662,8 @@ async def end_call(data: dict):
 
         print("end signal: ", end_signal)
 
-        if caller_id in connected_clients:
-            await connected_clients[caller_id].send_json(end_signal)
-        if recipient_id in connected_clients:
-            await connected_clients[recipient_id].send_json(end_signal)
+        for participant_id in participants:
+            connected_clients.send_signal(participant_id, end_signal)
 
         return {"message": "Call ended successfully"}
     except Exception as e:
@@ -449,9 +690,7 @@ async def start_call(data: dict):
         print("connected clients: ", connected_clients)
 
         # Send only to the intended recipient
-        if recipient_id in connected_clients:
-            recipient_ws = connected_clients[recipient_id]
-            await recipient_ws.send_json(call_signal)
+        if connected_clients.send_signal(recipient_id, call_signal):
             return {"message": "Call signal sent successfully"}
         else:
             raise HTTPException(status_code=404, detail="Recipient not connected")
@@ -464,7 +703,7 @@ async def start_call(data: dict):
 @app.post("/signup")
 async def signup(data: dict):
     try:
-        with engine.connect() as conn:
+        async with db_connection() as conn:
             query = text(
                 """
                 INSERT INTO users (first_name)
@@ -472,9 +711,9 @@ async def signup(data: dict):
                 RETURNING id, first_name
             """
             )
-            result = conn.execute(query, {"first_name": data["first_name"]})
+            result = await conn.execute(query, {"first_name": data["first_name"]})
             user = result.fetchone()
-            conn.commit()
+            await conn.commit()
 
             return {
                 "id": str(user.id),
@@ -488,7 +727,7 @@ async def signup(data: dict):
 @app.post("/login")
 async def login(data: dict):
     try:
-        with engine.connect() as conn:
+        async with db_connection() as conn:
             query = text(
                 """
                 SELECT id, first_name, language_code FROM users
@@ -496,7 +735,7 @@ async def login(data: dict):
                 LIMIT 1
             """
             )
-            result = conn.execute(query, {"first_name": data["first_name"]})
+            result = await conn.execute(query, {"first_name": data["first_name"]})
             user = result.fetchone()
 
             if not user:
@@ -514,9 +753,9 @@ async def login(data: dict):
 @app.get("/users")
 async def get_users():
     try:
-        with engine.connect() as conn:
+        async with db_connection() as conn:
             query = text("SELECT id, first_name, language_code FROM users")
-            result = conn.execute(query)
+            result = await conn.execute(query)
             users = [
                 {"id": str(row.id), "first_name": row.first_name} for row in result
             ]
@@ -528,28 +767,11 @@ async def get_users():
 @app.get("/users/{user_id}/voices")
 async def get_user_voices(user_id: str):
     try:
-        with engine.connect() as conn:
-            query = text(
-                """
-                SELECT v.id, v.external_id, v.created_at
-                FROM voices v
-                WHERE v.user_id = :user_id
-                ORDER BY v.created_at DESC
-                LIMIT 1
-            """
-            )
-            print(user_id)
-            result = conn.execute(query, {"user_id": user_id})
-            voice = result.fetchone()
-
-            if not voice:
-                return None
-
-            return {
-                "id": str(voice.id),
-                "external_id": voice.external_id,
-                "created_at": voice.created_at.isoformat(),
-            }
+        print(user_id)
+        profile = await get_user_profile(user_id)
+        if not profile:
+            return None
+        return profile["voice"]
     except Exception as e:
         return {"error": str(e)}
 
@@ -558,7 +780,7 @@ async def get_user_voices(user_id: str):
 async def update_user_language(user_id: str, language_code: str = Form(...)):
     try:
         print(f"Updating language for user {user_id} to {language_code}")
-        with engine.connect() as conn:
+        async with db_connection() as conn:
             query = text(
                 """
                 UPDATE users
@@ -566,10 +788,11 @@ async def update_user_language(user_id: str, language_code: str = Form(...)):
                 WHERE id = :user_id
                 """
             )
-            result = conn.execute(
+            result = await conn.execute(
                 query, {"language_code": language_code, "user_id": user_id}
             )
-            conn.commit()
+            await conn.commit()
+            profile_cache.update(user_id, language_code=language_code)
 
             # print(f"Result: {result.rowcount}")
 
@@ -588,20 +811,12 @@ async def update_user_language(user_id: str, language_code: str = Form(...)):
 @app.get("/users/{user_id}")
 async def get_user(user_id: str):
     try:
-        with engine.connect() as conn:
-            query = text(
-                """
-                SELECT id, first_name, language_code FROM users
-                WHERE id = :user_id
-                """
-            )
-            result = conn.execute(query, {"user_id": user_id})
-            user = result.fetchone()
+        user = await get_user_profile(user_id)
 
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
 
-            return {"id": str(user.id), "first_name": user.first_name}
+        return {"id": user["id"], "first_name": user["first_name"]}
     except Exception as e:
         return {"error": str(e)}
 
@@ -612,21 +827,38 @@ async def accept_call(data: dict):
     caller_id = data.get("caller_id")
     recipient_id = data.get("recipient_id")
 
-    ongoing_calls.append((caller_id, recipient_id))
-
     if not caller_id or not recipient_id:
         raise HTTPException(status_code=400, detail="Missing caller_id or recipient_id")
 
+    ongoing_calls.accept(caller_id, recipient_id)
+
+    # Keep languages and voices on the call so the translation pipeline
+    # doesn't need to look them up per utterance
+    for participant_id in (caller_id, recipient_id):
+        try:
+            profile = await get_user_profile(participant_id)
+        except Exception as e:
+            print(f"Error fetching profile for {participant_id}: {e}")
+            continue
+        if profile:
+            voice_id = profile["voice"]["external_id"] if profile["voice"] else None
+            ongoing_calls.update_participant(
+                participant_id,
+                language_code=profile["language_code"],
+                voice_id=voice_id,
+            )
+            if voice_id:
+                # Have the TTS connection ready before the first utterance
+                asyncio.create_task(tts_sessions.warm(voice_id))
+
     # Notify both parties that the call was accepted
-    if caller_id in connected_clients:
-        await connected_clients[caller_id].send_json(
-            {"type": "call_accepted", "recipient_id": recipient_id}
-        )
+    connected_clients.send_signal(
+        caller_id, {"type": "call_accepted", "recipient_id": recipient_id}
+    )
 
-    if recipient_id in connected_clients:
-        await connected_clients[recipient_id].send_json(
-            {"type": "call_accepted", "caller_id": caller_id}
-        )
+    connected_clients.send_signal(
+        recipient_id, {"type": "call_accepted", "caller_id": caller_id}
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import asyncio
+import bisect
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Readiness limits: a worker stops taking new traffic past any of them
+MAX_WS_SESSIONS = int(os.getenv("MAX_WS_SESSIONS", "200"))
+READY_MAX_LOOP_LAG = float(os.getenv("READY_MAX_LOOP_LAG", "0.25"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def metric(name: str, kind: str, help: str, samples, labelnames: Sequence[str] = ()) -> List[str]:
+    """Prometheus text lines for one metric; samples is [(label values, value)] or a bare value."""
+    if not isinstance(samples, list):
+        samples = [((), samples)]
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for values, value in samples:
+        lines.append(f"{name}{_labels(labelnames, values)} {float(value)}")
+    return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram; observe() is a bisect and two adds."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            series_labels = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{series_labels} {total}")
+            lines.append(f"{self.name}_count{series_labels} {count}")
+        return lines
+
+
+class Counter:
+    """Process-lifetime total; never decreases, so rate() sees no false resets."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self) -> List[str]:
+        return metric(self.name, "counter", self.help, self.value)
+
+
+# Drops counted where they happen, not summed over what is still open
+audio_dropped_bytes = Counter(
+    "audio_buffer_dropped_bytes_total", "Audio dropped by full STT buffers"
+)
+outbound_dropped_messages = Counter(
+    "outbound_dropped_messages_total", "Audio chunks dropped for slow listeners"
+)
+outbound_dropped_utterances = Counter(
+    "outbound_dropped_utterances_total", "Utterances dropped for slow listeners"
+)
+
+# Time spent waiting on external services, by service and stage
+upstream_latency = Histogram(
+    "upstream_latency_seconds",
+    "Latency of calls to Speechmatics, OpenAI and ElevenLabs",
+    labelnames=("service", "stage"),
+)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.lag = 0.0
+        self.histogram = Histogram(
+            "event_loop_lag_seconds", "Delay in waking a task sleeping on the event loop"
+        )
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - expected)
+            self.histogram.observe(self.lag)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+loop_lag = LoopLagMonitor()
+
+# Open /ws sessions, each mapped to a getter for its current AudioProcessor
+ws_sessions: Dict[int, Callable[[], Optional[object]]] = {}
+
+
+def readiness(db_pool: dict, db_max_overflow: int) -> List[str]:
+    """Reasons this worker shouldn't take new sessions; empty when it's ready."""
+    reasons = []
+    if len(ws_sessions) >= MAX_WS_SESSIONS:
+        reasons.append(f"{len(ws_sessions)} /ws sessions (limit {MAX_WS_SESSIONS})")
+    if loop_lag.lag > READY_MAX_LOOP_LAG:
+        reasons.append(f"event loop lag {loop_lag.lag * 1000:.0f} ms")
+    if "size" in db_pool and db_pool["checked_out"] >= db_pool["size"] + db_max_overflow:
+        reasons.append("database pool exhausted")
+    return reasons
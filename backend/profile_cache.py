@@ -0,0 +1,115 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import text
+
+from db import db_connection
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+
+class ProfileCache:
+    """In-process LRU of user profiles with a TTL per entry.
+
+    A profile holds the user's first_name, language_code and latest voice
+    record. Writers in this process update or invalidate entries directly;
+    the TTL bounds staleness from writes made by other workers.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user_id: str, profile: dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def update(self, user_id: str, **fields):
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            entry[1].update(fields)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+profile_cache = ProfileCache()
+
+
+async def get_user_profile(user_id) -> Optional[dict]:
+    """Return the cached profile for user_id, loading it from the database on a miss."""
+    if user_id is None:
+        return None
+    user_id = str(user_id)
+    profile = profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    async with db_connection() as conn:
+        query = text(
+            """
+            SELECT id, first_name, language_code FROM users
+            WHERE id = :user_id
+            """
+        )
+        result = await conn.execute(query, {"user_id": user_id})
+        user = result.fetchone()
+        if not user:
+            return None
+
+        query = text(
+            """
+            SELECT v.id, v.external_id, v.created_at
+            FROM voices v
+            WHERE v.user_id = :user_id
+            ORDER BY v.created_at DESC
+            LIMIT 1
+            """
+        )
+        result = await conn.execute(query, {"user_id": user_id})
+        voice = result.fetchone()
+
+    profile = {
+        "id": str(user.id),
+        "first_name": user.first_name,
+        "language_code": user.language_code,
+        "voice": (
+            {
+                "id": str(voice.id),
+                "external_id": voice.external_id,
+                "created_at": voice.created_at.isoformat(),
+            }
+            if voice
+            else None
+        ),
+    }
+    profile_cache.put(user_id, profile)
+    return profile
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from audio_format import bytes_per_sample
+
+# Default engine for the deployment, plus per-language overrides such as
+# "ja:whisper,ko:whisper"
+STT_ENGINE = os.getenv("STT_ENGINE", "speechmatics")
+STT_ENGINE_OVERRIDES = os.getenv("STT_ENGINE_OVERRIDES", "")
+
+
+class STTEngine(ABC):
+    """Streaming speech-to-text engine fed from an AudioProcessor.
+
+    Subclasses implement transcribe_audio_stream(), call on_transcript with
+    each final transcript, and advance transcribed_until (seconds of audio
+    covered by final transcripts) through _mark_transcribed() so that
+    flush() can find utterance boundaries without closing the stream.
+    """
+
+    # Seconds of silence appended by mark_utterance_end()
+    utterance_padding = 1.0
+    # Raw PCM encoding the engine reads from its AudioProcessor
+    encoding = "pcm_f32le"
+
+    def __init__(
+        self,
+        language: str = "en",
+        sample_rate: int = 16000,
+        on_transcript: Optional[Callable[[str], None]] = None,
+    ):
+        self.language = language
+        self.sample_rate = sample_rate
+        self.on_transcript = on_transcript
+        self.transcribed_until = 0.0
+        self._progress = asyncio.Event()
+
+    @abstractmethod
+    async def transcribe_audio_stream(self, audio_processor):
+        ...
+
+    def _mark_transcribed(self, position: float):
+        self.transcribed_until = position
+        self._progress.set()
+
+    def mark_utterance_end(self, audio_processor) -> float:
+        """Pad the stream so trailing words get finalised; returns the boundary position.
+
+        Appends silence instead of closing the stream, so the same session
+        carries on into the next utterance.
+        """
+        bytes_per_second = self.sample_rate * bytes_per_sample(self.encoding)
+        position = audio_processor.total_written / bytes_per_second
+        audio_processor.write_audio(
+            bytes(int(self.utterance_padding * bytes_per_second))
+        )
+        return position
+
+    async def _wait_for_progress(self, position):
+        while self.transcribed_until < position:
+            self._progress.clear()
+            await self._progress.wait()
+
+    async def wait_transcribed(self, position: float, timeout: float = 3.0) -> bool:
+        """Wait for final transcripts up to position; False if they didn't arrive in time."""
+        try:
+            await asyncio.wait_for(self._wait_for_progress(position), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def flush(self, audio_processor, timeout: float = 3.0) -> bool:
+        """Wait until everything written so far has a final transcript."""
+        position = self.mark_utterance_end(audio_processor)
+        return await self.wait_transcribed(position, timeout)
+
+
+def engine_name_for(language: str) -> str:
+    for override in STT_ENGINE_OVERRIDES.split(","):
+        code, _, name = override.partition(":")
+        if code.strip() == language and name.strip():
+            return name.strip()
+    return STT_ENGINE
+
+
+def create_stt_engine(
+    language: str = "en",
+    sample_rate: int = 16000,
+    on_transcript: Optional[Callable[[str], None]] = None,
+    engine: Optional[str] = None,
+) -> STTEngine:
+    """Build the configured engine for language; backends are imported on demand."""
+    engine = engine or engine_name_for(language)
+    if engine == "speechmatics":
+        from services.speech_to_text.speechmatics_client import SpeechmaticsClient
+
+        return SpeechmaticsClient(
+            api_key=os.getenv("SPEECHMATICS_API_KEY"),
+            language=language,
+            sample_rate=sample_rate,
+            on_transcript=on_transcript,
+        )
+    if engine == "whisper":
+        from services.speech_to_text.faster_whisper_client import FasterWhisperClient
+
+        return FasterWhisperClient(
+            language=language,
+            sample_rate=sample_rate,
+            on_transcript=on_transcript,
+        )
+    raise ValueError(f"Unknown STT engine: {engine}")
@@ -0,0 +1,192 @@
+import string
+import uuid
+import numpy as np
+from typing import Optional, Callable
+
+from services.speech_to_text.engine import STTEngine
+from services.speech_to_text.whisper_pool import get_scheduler
+
+
+def _normalize(word: str) -> str:
+    return word.strip().strip(string.punctuation).lower()
+
+
+class FasterWhisperClient(STTEngine):
+    """Local streaming Whisper engine.
+
+    Audio accumulates in a window that is re-decoded every step_seconds
+    while speech is present, optionally with the last prompt_chars of
+    committed text passed as the prompt. Words are committed once they are
+    stable:
+
+    - "agreement" (default): words on which two consecutive decodes agree
+      (local agreement). Audio that has already been decoded max_decodes
+      times is committed from the latest decode regardless, so no sample is
+      decoded more than max_decodes times.
+    - "holdback": words ending more than holdback_seconds before the end
+      of the window.
+
+    The window is then trimmed to just before the last committed word, so
+    the next decode keeps some context. Silent steps with nothing pending
+    are dropped without running the model, and a silent step after speech
+    commits whatever is left.
+    """
+
+    def __init__(
+        self,
+        language: str = "en",
+        sample_rate: int = 16000,
+        on_transcript: Optional[Callable[[str], None]] = None,
+        step_seconds: float = 1.0,
+        commit_policy: str = "agreement",
+        holdback_seconds: float = 1.0,
+        max_decodes: int = 4,
+        overlap_seconds: float = 0.5,
+        max_window_seconds: float = 15.0,
+        prompt_chars: int = 0,
+        speech_threshold: float = 0.01,
+        model_size: str = "large-v3",
+        compute_type: str = "int8",
+    ):
+        super().__init__(language, sample_rate, on_transcript)
+        if commit_policy not in ("agreement", "holdback"):
+            raise ValueError(f"Unknown commit policy: {commit_policy}")
+        self.step_seconds = step_seconds
+        self.commit_policy = commit_policy
+        self.holdback_seconds = holdback_seconds
+        self.max_decodes = max_decodes
+        self.overlap_seconds = overlap_seconds
+        self.max_window_seconds = max_window_seconds
+        # Committed text carried into the next decode. Off by default: a
+        # prompted decode only batches with sessions sending the same prompt,
+        # so each prompting session costs a model call of its own
+        self.prompt_chars = prompt_chars
+        self.speech_threshold = speech_threshold
+        # Two steps of silence guarantee one whole silent step, which commits
+        self.utterance_padding = 2 * step_seconds
+
+        # The model itself is shared process-wide; decodes from concurrent
+        # sessions are batched by its scheduler
+        self.session_id = uuid.uuid4().hex
+        self.scheduler = get_scheduler(model_size, compute_type)
+        self._committed_text = ""
+
+    def _is_speech(self, samples: np.ndarray) -> bool:
+        if samples.size == 0:
+            return False
+        return float(np.sqrt(np.mean(np.square(samples)))) >= self.speech_threshold
+
+    def _prompt(self) -> Optional[str]:
+        if not self.prompt_chars or not self._committed_text:
+            return None
+        return self._committed_text[-self.prompt_chars :]
+
+    async def _decode(self, window: np.ndarray):
+        return await self.scheduler.transcribe(
+            self.session_id, window, self.language, self._prompt()
+        )
+
+    @property
+    def stats(self) -> dict:
+        """Queue latency and real-time factor of this session's recent decodes."""
+        stats = self.scheduler.stats.get(self.session_id)
+        return stats.snapshot() if stats else {}
+
+    def _stable_words(self, words, previous, window_end):
+        """Split words (absolute times) into the stable prefix and the rest."""
+        if self.commit_policy == "holdback":
+            stable_until = window_end - self.holdback_seconds
+            count = sum(1 for w in words if w.end <= stable_until)
+        else:
+            count = 0
+            while (
+                count < len(words)
+                and count < len(previous)
+                and _normalize(words[count].word) == _normalize(previous[count].word)
+            ):
+                count += 1
+            # Audio before this point has been in max_decodes decodes already
+            forced_until = window_end - (self.max_decodes - 1) * self.step_seconds
+            while count < len(words) and words[count].end <= forced_until:
+                count += 1
+        return words[:count], words[count:]
+
+    def _commit(self, words):
+        text = "".join(w.word for w in words).strip()
+        if not text:
+            return
+        self._committed_text = f"{self._committed_text} {text}".strip()
+        if self.on_transcript:
+            self.on_transcript(text)
+
+    async def transcribe_audio_stream(self, audio_processor):
+        step_bytes = int(self.step_seconds * self.sample_rate) * 4
+        window = np.zeros(0, dtype=np.float32)
+        # Stream time (seconds) of window[0], and end of the last committed word
+        window_start = 0.0
+        committed_until = 0.0
+        pending_speech = False
+        # Uncommitted words of the previous decode, in stream time
+        previous = []
+        self.transcribed_until = 0.0
+
+        try:
+            while True:
+                chunk = await audio_processor.read(step_bytes)
+                final = len(chunk) < step_bytes
+                samples = np.frombuffer(chunk, dtype=np.float32)
+                window = np.concatenate((window, samples))
+                window_end = window_start + window.size / self.sample_rate
+                speech = self._is_speech(samples)
+
+                if not speech and not pending_speech:
+                    # Nothing to decode; keep only a little context
+                    keep = int(self.overlap_seconds * self.sample_rate)
+                    window_start = window_end - min(keep, window.size) / self.sample_rate
+                    window = window[window.size - min(keep, window.size) :]
+                    self._mark_transcribed(window_end)
+                    if final:
+                        break
+                    continue
+
+                pending_speech = True
+                words = [
+                    word._replace(start=window_start + word.start, end=window_start + word.end)
+                    for word in await self._decode(window)
+                    if window_start + word.start >= committed_until - 0.05
+                ]
+
+                # End of phrase, end of stream or a full window commits everything
+                commit_all = (
+                    final
+                    or not speech
+                    or window.size >= self.max_window_seconds * self.sample_rate
+                )
+                if commit_all:
+                    stable, previous = words, []
+                else:
+                    stable, previous = self._stable_words(words, previous, window_end)
+
+                if stable:
+                    committed_until = stable[-1].end
+                    self._commit(stable)
+
+                if commit_all:
+                    committed_until = window_end
+                    pending_speech = False
+                self._mark_transcribed(committed_until)
+
+                # Trim to just before the committed point, keeping some context
+                cut = max(committed_until - self.overlap_seconds, window_start)
+                cut_samples = int((cut - window_start) * self.sample_rate)
+                window = window[cut_samples:]
+                window_start += cut_samples / self.sample_rate
+
+                if final:
+                    break
+
+        except Exception as e:
+            print(f"Error during transcription: {str(e)}")
+            raise
+        finally:
+            self.scheduler.forget(self.session_id)
@@ -1,15 +1,35 @@
 import asyncio
-import speechmatics
-from typing import AsyncGenerator, Callable, Optional
-from speechmatics.models import (
-    ServerMessageType,
-    TranscriptionConfig,
-    ConnectionSettings,
-    AudioSettings,
-)
+import json
+import time
+import websockets
+from typing import AsyncIterator, Callable, NamedTuple, Optional
 
+from metrics import upstream_latency
+from services.speech_to_text.engine import STTEngine
+
+
+class Transcript(NamedTuple):
+    text: str
+    is_final: bool
+    start_time: float
+    end_time: float
+
+
+class SpeechmaticsError(Exception):
+    pass
+
+
+class SpeechmaticsClient(STTEngine):
+    """Speechmatics realtime client running directly on the event loop.
+
+    Speaks the RT v2 WebSocket protocol itself rather than going through
+    speechmatics-python's run_synchronously, so a session costs a socket
+    and two tasks instead of a thread from the default executor.
+    """
+
+    # Half the upstream bandwidth of pcm_f32le
+    encoding = "pcm_s16le"
 
-class SpeechmaticsClient:
     def __init__(
         self,
         api_key: str,
@@ -18,51 +38,102 @@ class SpeechmaticsClient:
         connection_url: str = "wss://eu2.rt.speechmatics.com/v2",
         on_transcript: Optional[Callable[[str], None]] = None,
     ):
+        super().__init__(language, sample_rate, on_transcript)
         self.api_key = api_key
-        self.language = language
         self.connection_url = connection_url
-        self.sample_rate = sample_rate
-        self.on_transcript = on_transcript
-
-        self.ws_client = speechmatics.client.WebsocketClient(
-            ConnectionSettings(
-                url=connection_url,
-                auth_token=api_key,
-            )
-        )
+        self.max_delay = 1
+        # Silence that lets the server finalise trailing words
+        self.utterance_padding = self.max_delay
+        # Largest audio message; roughly 100 ms of int16 at 16 kHz
+        self.chunk_size = 1024 * 3
 
-        self.ws_client.add_event_handler(
-            event_name=ServerMessageType.AddTranscript,
-            event_handler=self._sync_handle_transcript,
+    def _start_message(self, enable_partials: bool) -> str:
+        return json.dumps(
+            {
+                "message": "StartRecognition",
+                "audio_format": {
+                    "type": "raw",
+                    "encoding": self.encoding,
+                    "sample_rate": self.sample_rate,
+                },
+                "transcription_config": {
+                    "language": self.language,
+                    "max_delay": self.max_delay,
+                    "enable_partials": enable_partials,
+                },
+            }
         )
 
-    def _sync_handle_transcript(self, msg):
-        transcript = msg["metadata"]["transcript"]
-        print("handle transcript")
-        if self.on_transcript:
-            self.on_transcript(transcript)
-
-    async def transcribe_audio_stream(
-        self, audio_processor
-    ) -> AsyncGenerator[str, None]:
-        config = TranscriptionConfig(
-            language=self.language,
-            max_delay=1,
-        )
+    async def _send_audio(self, ws, audio_processor):
+        seq_no = 0
+        while True:
+            chunk = await audio_processor.read_some(self.chunk_size)
+            if not chunk:
+                break
+            await ws.send(chunk)
+            seq_no += 1
+        await ws.send(json.dumps({"message": "EndOfStream", "last_seq_no": seq_no}))
+
+    async def transcripts(
+        self, audio_processor, enable_partials: bool = True
+    ) -> AsyncIterator[Transcript]:
+        """Stream audio_processor to Speechmatics and yield partial and final transcripts.
+
+        Ends once the processor is closed and the server has sent
+        EndOfTranscript.
+        """
+        self.transcribed_until = 0.0
+        started = time.perf_counter()
+        async with websockets.connect(
+            self.connection_url,
+            additional_headers={"Authorization": f"Bearer {self.api_key}"},
+        ) as ws:
+            await ws.send(self._start_message(enable_partials))
+            while True:
+                msg = json.loads(await ws.recv())
+                if msg["message"] == "RecognitionStarted":
+                    upstream_latency.observe(
+                        time.perf_counter() - started, "speechmatics", "session_start"
+                    )
+                    break
+                if msg["message"] == "Error":
+                    raise SpeechmaticsError(msg.get("reason", msg))
 
-        settings = AudioSettings()
-        settings.encoding = "pcm_f32le"
-        settings.sample_rate = self.sample_rate
-        settings.chunk_size = 1024
+            sender = asyncio.create_task(self._send_audio(ws, audio_processor))
+            try:
+                async for raw in ws:
+                    msg = json.loads(raw)
+                    message_type = msg["message"]
+                    if message_type in ("AddTranscript", "AddPartialTranscript"):
+                        metadata = msg["metadata"]
+                        is_final = message_type == "AddTranscript"
+                        yield Transcript(
+                            metadata["transcript"],
+                            is_final,
+                            metadata.get("start_time", 0.0),
+                            metadata.get("end_time", 0.0),
+                        )
+                        if is_final:
+                            self._mark_transcribed(metadata.get("end_time", 0.0))
+                    elif message_type == "EndOfTranscript":
+                        break
+                    elif message_type == "Error":
+                        raise SpeechmaticsError(msg.get("reason", msg))
+                    elif message_type == "Warning":
+                        print(f"Speechmatics warning: {msg.get('reason')}")
+                if sender.done() and sender.exception():
+                    raise sender.exception()
+            finally:
+                sender.cancel()
 
+    async def transcribe_audio_stream(self, audio_processor):
+        """Run transcripts() to completion, passing each final one to on_transcript."""
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                self.ws_client.run_synchronously,
-                audio_processor,
-                config,
-                settings,
-            )
+            async for transcript in self.transcripts(
+                audio_processor, enable_partials=False
+            ):
+                if self.on_transcript:
+                    self.on_transcript(transcript.text)
         except Exception as e:
             print(f"Error during transcription: {str(e)}")
             raise
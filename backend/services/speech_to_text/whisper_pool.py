@@ -0,0 +1,330 @@
+import asyncio
+import bisect
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+# CTranslate2 intra-op threads per decode (0 = library default of 4) and
+# inter-op workers that may run decodes in parallel
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+WHISPER_MAX_BATCH = int(os.getenv("WHISPER_MAX_BATCH", "16"))
+WHISPER_BATCH_WAIT = float(os.getenv("WHISPER_BATCH_WAIT_MS", "20")) / 1000
+# "thread" (default) runs decodes in threads of this process, which share
+# its one copy of each model; CTranslate2 releases the GIL while decoding,
+# and runs up to WHISPER_NUM_WORKERS of them in parallel. "process" runs
+# them in worker processes fed through shared memory, but every worker
+# loads its own copy of the model (roughly 1.5 GB of RAM for large-v3 in
+# int8), so it defaults to a single worker. Both keep the event loop free.
+WHISPER_POOL = os.getenv("WHISPER_POOL", "thread")
+WHISPER_POOL_WORKERS = int(
+    os.getenv(
+        "WHISPER_POOL_WORKERS",
+        str(WHISPER_NUM_WORKERS if WHISPER_POOL == "thread" else 1),
+    )
+)
+
+# Whisper only takes 16 kHz mono input
+WHISPER_SAMPLE_RATE = 16000
+
+_models: Dict[tuple, WhisperModel] = {}
+# Pipelines keep per-call state (last_speech_timestamp, used to cut words
+# at clip boundaries), so each pool thread gets its own over the shared model
+_pipelines = threading.local()
+_models_lock = threading.Lock()
+_schedulers: Dict[tuple, "InferenceScheduler"] = {}
+
+
+def get_model(size: str = "large-v3", compute_type: str = "int8", device: str = "cpu"):
+    """Load each (size, compute_type, device) once per process, on first use."""
+    key = (size, compute_type, device)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = WhisperModel(
+                model_size_or_path=size,
+                device=device,
+                compute_type=compute_type,
+                cpu_threads=WHISPER_CPU_THREADS,
+                num_workers=WHISPER_NUM_WORKERS,
+                download_root=os.path.join(
+                    os.path.expanduser("~"), ".cache", "whisper"
+                ),
+            )
+        return _models[key]
+
+
+def _get_pipeline(model_key: tuple) -> BatchedInferencePipeline:
+    """This thread's pipeline for model_key; the model itself is shared."""
+    pipelines = getattr(_pipelines, "by_model", None)
+    if pipelines is None:
+        pipelines = _pipelines.by_model = {}
+    if model_key not in pipelines:
+        pipelines[model_key] = BatchedInferencePipeline(model=get_model(*model_key))
+    return pipelines[model_key]
+
+
+def get_scheduler(size: str = "large-v3", compute_type: str = "int8", device: str = "cpu"):
+    key = (size, compute_type, device)
+    if key not in _schedulers:
+        _schedulers[key] = InferenceScheduler(key)
+    return _schedulers[key]
+
+
+class Word(NamedTuple):
+    start: float
+    end: float
+    word: str
+
+
+def _infer_batch(
+    model_key: tuple,
+    audio: np.ndarray,
+    clips: List[dict],
+    language: str,
+    prompt: Optional[str] = None,
+) -> List[List[Word]]:
+    """Decode each clip of audio; runs in a pool worker."""
+    # Clip boundaries are in samples; returned timestamps are in seconds
+    # from the start of the concatenated audio
+    offsets = [clip["start"] / WHISPER_SAMPLE_RATE for clip in clips]
+    segments, info = _get_pipeline(model_key).transcribe(
+        audio,
+        language=language,
+        word_timestamps=True,
+        vad_filter=False,
+        initial_prompt=prompt,
+        clip_timestamps=clips,
+        batch_size=len(clips),
+    )
+
+    results = [[] for _ in clips]
+    for segment in segments:
+        for word in segment.words or ():
+            # Attribute each word to the clip its midpoint falls in
+            index = bisect.bisect_right(offsets, (word.start + word.end) / 2) - 1
+            index = min(max(index, 0), len(clips) - 1)
+            offset = offsets[index]
+            results[index].append(Word(word.start - offset, word.end - offset, word.word))
+    return results
+
+
+def _infer_shared(
+    model_key: tuple,
+    shm_name: str,
+    samples: int,
+    clips: List[dict],
+    language: str,
+    prompt: Optional[str] = None,
+):
+    """Process-pool entry point: read the batch straight out of shared memory."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+        try:
+            return _infer_batch(model_key, audio, clips, language, prompt)
+        finally:
+            del audio
+    finally:
+        shm.close()
+
+
+class _Request(NamedTuple):
+    session_id: str
+    window: np.ndarray
+    language: str
+    prompt: Optional[str]
+    submitted: float
+    future: asyncio.Future
+
+
+class SessionStats:
+    def __init__(self, history: int = 100):
+        self.queue_latency = deque(maxlen=history)
+        self.real_time_factor = deque(maxlen=history)
+
+    def snapshot(self) -> dict:
+        def mean(values):
+            return sum(values) / len(values) if values else 0.0
+
+        return {
+            "decodes": len(self.queue_latency),
+            "avg_queue_latency_seconds": mean(self.queue_latency),
+            "avg_real_time_factor": mean(self.real_time_factor),
+        }
+
+
+class InferenceScheduler:
+    """Batches decode requests from concurrent sessions into one model call.
+
+    Requests arriving within WHISPER_BATCH_WAIT of each other (up to
+    WHISPER_MAX_BATCH) are concatenated into a single audio buffer and
+    decoded as separate clips by faster-whisper's batched pipeline, i.e.
+    one batched CTranslate2 generate call. Batches never run on the event
+    loop: they go to a pool of WHISPER_POOL_WORKERS threads sharing the
+    model (each with its own pipeline) or processes (audio handed over in shared memory, samples are
+    never pickled), with up to that many batches in flight at once.
+    """
+
+    def __init__(
+        self,
+        model_key: tuple,
+        max_batch: int = WHISPER_MAX_BATCH,
+        batch_wait: float = WHISPER_BATCH_WAIT,
+        pool: str = WHISPER_POOL,
+        workers: int = WHISPER_POOL_WORKERS,
+    ):
+        self.model_key = model_key
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.use_processes = pool == "process"
+        self.workers = workers
+        self.stats: Dict[str, SessionStats] = {}
+        self._queue = None
+        self._held = deque()
+        self._slots = None
+        self._worker = None
+        if self.use_processes:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix="whisper")
+
+    async def transcribe(
+        self,
+        session_id: str,
+        window: np.ndarray,
+        language: str,
+        prompt: Optional[str] = None,
+    ) -> List[Word]:
+        """Decode window (float32 mono) and return its words with window-relative times.
+
+        prompt is passed to Whisper as preceding text. Only requests with
+        the same language and prompt share a batch, and each batch is one
+        model call in its own pool slot, so sessions sending prompts give
+        up most cross-session batching.
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = loop.create_future()
+        self._queue.put_nowait(
+            _Request(session_id, window, language, prompt, time.perf_counter(), future)
+        )
+        return await future
+
+    def forget(self, session_id: str):
+        self.stats.pop(session_id, None)
+
+    def shutdown(self):
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free pool slot first, so requests keep batching up
+            # while every worker is busy
+            await self._slots.acquire()
+            first = self._held.popleft() if self._held else await self._queue.get()
+            # The batched pipeline takes a single language and prompt per
+            # call; other requests are held, in order, for the next batch
+            key = (first.language, first.prompt)
+            batch = [first]
+            held, self._held = self._held, deque()
+            for request in held:
+                if (request.language, request.prompt) == key and len(batch) < self.max_batch:
+                    batch.append(request)
+                else:
+                    self._held.append(request)
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if (request.language, request.prompt) == key:
+                    batch.append(request)
+                else:
+                    self._held.append(request)
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[_Request]):
+        try:
+            await self._decode(batch, batch[0].language, batch[0].prompt)
+        finally:
+            self._slots.release()
+
+    async def _decode(self, requests: List[_Request], language: str, prompt: Optional[str]):
+        loop = asyncio.get_running_loop()
+        samples = sum(request.window.size for request in requests)
+        clips = []
+        position = 0
+        for request in requests:
+            clips.append({"start": position, "end": position + request.window.size})
+            position += request.window.size
+
+        started = time.perf_counter()
+        shm = None
+        try:
+            if self.use_processes:
+                shm = shared_memory.SharedMemory(create=True, size=max(samples, 1) * 4)
+                audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+                np.concatenate([request.window for request in requests], out=audio)
+                del audio
+                results = await loop.run_in_executor(
+                    self._executor,
+                    _infer_shared,
+                    self.model_key,
+                    shm.name,
+                    samples,
+                    clips,
+                    language,
+                    prompt,
+                )
+            else:
+                audio = np.concatenate([request.window for request in requests])
+                results = await loop.run_in_executor(
+                    self._executor,
+                    _infer_batch,
+                    self.model_key,
+                    audio,
+                    clips,
+                    language,
+                    prompt,
+                )
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+        elapsed = time.perf_counter() - started
+        for request, words in zip(requests, results):
+            stats = self.stats.setdefault(request.session_id, SessionStats())
+            stats.queue_latency.append(started - request.submitted)
+            duration = request.window.size / WHISPER_SAMPLE_RATE
+            if duration:
+                stats.real_time_factor.append(elapsed / duration)
+            if not request.future.done():
+                request.future.set_result(words)
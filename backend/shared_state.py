@@ -1,3 +1,15 @@
 # This module holds shared state between different parts of the application
-connected_clients = {}
-ongoing_calls = []
\ No newline at end of file
+from call_registry import CallRegistry
+from connections import ConnectionRegistry
+from broker import create_broker
+from tts_sessions import TTSSessionManager
+from http_clients import HTTPClients
+
+connected_clients = ConnectionRegistry()
+ongoing_calls = CallRegistry()
+# Relays signaling, audio and call transitions between worker processes
+broker = create_broker()
+# Warm ElevenLabs connections, one per voice
+tts_sessions = TTSSessionManager()
+# Pooled OpenAI and ElevenLabs REST clients
+http_clients = HTTPClients()
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Modules read these at import time; point them at throwaway local state
+_state_dir = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("DB_URL", f"sqlite:///{os.path.join(_state_dir, 'test.db')}")
+os.environ.setdefault("AUDIO_CACHE_DIR", os.path.join(_state_dir, "tts"))
+
+# (test name, figures) from every benchmark that ran, shown after the run
+_benchmarks = []
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: measures throughput or latency; deselect with -m 'not benchmark'"
+    )
+
+
+@pytest.fixture
+def report(request):
+    """Record a benchmark's figures for the summary at the end of the run."""
+
+    def record(**figures):
+        _benchmarks.append((request.node.name, figures))
+
+    return record
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _benchmarks:
+        return
+    terminalreporter.section("benchmarks")
+    for name, figures in _benchmarks:
+        values = ", ".join(
+            f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in figures.items()
+        )
+        terminalreporter.write_line(f"{name}: {values}")
@@ -0,0 +1,89 @@
+"""Just enough of the Redis protocol for pub/sub, to run brokers locally."""
+
+import asyncio
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class RespServer:
+    """PUBLISH, SUBSCRIBE and UNSUBSCRIBE over TCP; anything else is acknowledged."""
+
+    def __init__(self):
+        self.channels = {}
+        self.writers = set()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}"
+
+    async def start(self, port: int = 0):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        return self
+
+    async def close(self):
+        self.disconnect_all()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def disconnect_all(self):
+        """Drop every client, as a restarting Redis would."""
+        for writer in list(self.writers):
+            writer.close()
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    async def _handle(self, reader, writer):
+        self.writers.add(writer)
+        subscribed = set()
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                name, args = command[0].upper(), command[1:]
+                if name == b"SUBSCRIBE":
+                    for channel in args:
+                        self.channels.setdefault(channel, set()).add(writer)
+                        subscribed.add(channel)
+                        writer.write(_encode([b"subscribe", channel, len(subscribed)]))
+                elif name == b"UNSUBSCRIBE":
+                    for channel in args or list(subscribed):
+                        self.channels.get(channel, set()).discard(writer)
+                        subscribed.discard(channel)
+                        writer.write(_encode([b"unsubscribe", channel, len(subscribed)]))
+                elif name == b"PUBLISH":
+                    channel, message = args
+                    receivers = self.channels.get(channel, set())
+                    for receiver in receivers:
+                        receiver.write(_encode([b"message", channel, message]))
+                    writer.write(_encode(len(receivers)))
+                elif name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    writer.write(b"+OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscribed:
+                self.channels.get(channel, set()).discard(writer)
+            self.writers.discard(writer)
+            writer.close()
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+import text_translate
+from audio_cache import AudioCache, AudioRecording
+
+# Stand-in for ElevenLabs' time to first audio on a warm connection
+UPSTREAM_FIRST_AUDIO_SECONDS = 0.2
+
+
+def _recording(*chunks):
+    recording = AudioRecording()
+    for chunk in chunks:
+        recording.add(chunk)
+    return recording
+
+
+def test_workers_share_entries_and_one_size_bound(tmp_path):
+    # Sweeping on every save picks up the other worker's files at once
+    first = AudioCache(str(tmp_path), max_bytes=10_000, sweep_interval=0)
+    second = AudioCache(str(tmp_path), max_bytes=10_000, sweep_interval=0)
+
+    async def main():
+        await first.save("a", _recording(b"x" * 3000, b"y" * 1000))
+        # Written by the other worker, so absent from this one's memory
+        shared = await second.load("a")
+        for key in "bcd":
+            await second.save(key, _recording(b"z" * 3000))
+        await first.save("e", _recording(b"z" * 3000))
+        return shared
+
+    shared = asyncio.run(main())
+
+    assert [chunk for _, chunk in shared] == [b"x" * 3000, b"y" * 1000]
+    files = list(tmp_path.glob("*.bin"))
+    # The bound holds for the directory, not per worker
+    assert sum(path.stat().st_size for path in files) <= 10_000
+    assert first.stats()["bytes"] <= 10_000
+    assert (tmp_path / "e.bin").exists()
+
+
+def test_saves_only_rescan_the_directory_when_over_budget(tmp_path, monkeypatch):
+    directory = tmp_path / "tts"
+    cache = AudioCache(str(directory), max_bytes=10_000)
+    # Creating the cache touches nothing on disk
+    assert not directory.exists()
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+
+    async def main():
+        for key in range(3):
+            await cache.save(str(key), _recording(b"x" * 1000))
+        first_scans = len(scans)
+        # The tenth file takes the directory over budget
+        for key in range(3, 10):
+            await cache.save(str(key), _recording(b"x" * 1000))
+        return first_scans
+
+    first_scans = asyncio.run(main())
+
+    # One scan on first use; then only once the running total passed max_bytes
+    assert first_scans == 1
+    assert len(scans) == 2
+    files = list(directory.glob("*.bin"))
+    assert sum(path.stat().st_size for path in files) <= 10_000 * 0.9
+    assert cache.stats()["bytes"] == sum(path.stat().st_size for path in files)
+
+
+class FakeContext:
+    completed = True
+    first_audio_delay = 0.0
+
+    async def send(self, text):
+        pass
+
+    async def end(self):
+        pass
+
+    async def audio(self):
+        await asyncio.sleep(self.first_audio_delay)
+        yield b"mp3-1"
+        yield b"mp3-2"
+
+
+class FakeSessions:
+    contexts = 0
+
+    @asynccontextmanager
+    async def context(self, voice_id):
+        FakeSessions.contexts += 1
+        yield FakeContext()
+
+
+def test_streamed_cjk_translation_is_found_when_replayed(tmp_path, monkeypatch):
+    cache = AudioCache(str(tmp_path))
+    monkeypatch.setattr(text_translate, "audio_cache", cache)
+    monkeypatch.setattr(text_translate, "tts_sessions", FakeSessions())
+    translation = "你好，世界。今天天气很好。"
+
+    async def llm_tokens():
+        for token in ("你好", "，", "世界", "。", "今天", "天气", "很好", "。"):
+            yield token
+
+    async def cached_text():
+        yield translation
+
+    async def main():
+        await text_translate.text_to_speech_input_streaming(
+            "voice", llm_tokens(), broadcast=True, recipient_id="nobody"
+        )
+        await text_translate.text_to_speech_input_streaming(
+            "voice", cached_text(), broadcast=True, recipient_id="nobody", text=translation
+        )
+
+    asyncio.run(main())
+
+    assert FakeSessions.contexts == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.benchmark
+def test_time_to_first_byte_cached_vs_uncached(tmp_path, monkeypatch, report):
+    cache = AudioCache(str(tmp_path))
+    monkeypatch.setattr(text_translate, "audio_cache", cache)
+    monkeypatch.setattr(text_translate, "tts_sessions", FakeSessions())
+    monkeypatch.setattr(FakeContext, "first_audio_delay", UPSTREAM_FIRST_AUDIO_SECONDS)
+
+    async def speak(index, cached):
+        text = f"Frase número {index}."
+
+        async def tokens():
+            yield text
+
+        started = time.perf_counter()
+        first = []
+        await text_translate.text_to_speech_input_streaming(
+            "voice",
+            tokens(),
+            broadcast=True,
+            recipient_id="nobody",
+            on_first_audio=lambda: first.append(time.perf_counter() - started),
+            text=text if cached else None,
+        )
+        return first[0]
+
+    async def main():
+        uncached = [await speak(index, cached=False) for index in range(10)]
+        cached = [await speak(index, cached=True) for index in range(10)]
+        return uncached, cached
+
+    uncached, cached = asyncio.run(main())
+
+    report(
+        uncached_ttfb_ms=statistics.median(uncached) * 1000,
+        cached_ttfb_ms=statistics.median(cached) * 1000,
+    )
+    assert cache.stats()["hits"] == 10
+    assert statistics.median(cached) < UPSTREAM_FIRST_AUDIO_SECONDS / 4
@@ -0,0 +1,118 @@
+import asyncio
+import base64
+import json
+import time
+
+import numpy as np
+import pytest
+
+from audio_processor import AUDIO_FRAME_HEADER, AudioProcessor, parse_audio_frame
+
+IDLE_SESSIONS = 200
+IDLE_SECONDS = 1.0
+# 20 ms of 16 kHz pcm_f32le per microphone frame
+FRAME_BYTES = 320 * 4
+FRAMES = 20000
+
+
+class PollingAudioProcessor:
+    """The busy-poll reader AudioProcessor replaced, kept for comparison."""
+
+    def __init__(self):
+        self.wave_data = bytearray()
+        self.read_offset = 0
+
+    async def read(self, chunk_size):
+        while self.read_offset + chunk_size > len(self.wave_data):
+            await asyncio.sleep(0.001)
+        new_offset = self.read_offset + chunk_size
+        data = self.wave_data[self.read_offset : new_offset]
+        self.read_offset = new_offset
+        return data
+
+
+def _idle_cpu_seconds(processor_class) -> float:
+    """Process CPU time spent while IDLE_SESSIONS readers wait for audio that never comes."""
+
+    async def main():
+        readers = [
+            asyncio.create_task(processor_class().read(3072)) for _ in range(IDLE_SESSIONS)
+        ]
+        await asyncio.sleep(0.1)
+        started = time.process_time()
+        await asyncio.sleep(IDLE_SECONDS)
+        elapsed = time.process_time() - started
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        return elapsed
+
+    return asyncio.run(main())
+
+
+def test_reader_wakes_once_enough_audio_arrives():
+    async def main():
+        processor = AudioProcessor(capacity=8)
+        reader = asyncio.create_task(processor.read(4))
+        processor.write_audio(b"ab")
+        await asyncio.sleep(0.01)
+        assert not reader.done()
+        processor.write_audio(b"cdef")
+        first = await asyncio.wait_for(reader, 1)
+        # Wraps around the end of the ring
+        processor.write_audio(b"ghij")
+        rest = await processor.read(6)
+        processor.close()
+        return first, rest, await processor.read(4)
+
+    assert asyncio.run(main()) == (b"abcd", b"efghij", b"")
+
+
+@pytest.mark.benchmark
+def test_cpu_per_idle_session(report):
+    polling = _idle_cpu_seconds(PollingAudioProcessor)
+    event_driven = _idle_cpu_seconds(AudioProcessor)
+
+    report(
+        sessions=IDLE_SESSIONS,
+        polling_cpu_ms_per_session_second=polling / IDLE_SESSIONS / IDLE_SECONDS * 1000,
+        ring_cpu_ms_per_session_second=event_driven / IDLE_SESSIONS / IDLE_SECONDS * 1000,
+    )
+    # Waiting readers cost nothing until audio arrives
+    assert event_driven < polling / 10
+
+
+@pytest.mark.benchmark
+def test_binary_frames_per_second_against_json(report):
+    payload = np.random.default_rng(0).random(FRAME_BYTES // 4, dtype=np.float32).tobytes()
+    binary = [AUDIO_FRAME_HEADER.pack(0, sequence) + payload for sequence in range(FRAMES)]
+    legacy = [
+        json.dumps({"audio": base64.b64encode(payload).decode(), "terminal": False})
+        for _ in range(FRAMES)
+    ]
+
+    def ingest_binary(processor):
+        for frame in binary:
+            terminal, sequence, data = parse_audio_frame(frame)
+            processor.write_audio(data)
+
+    def ingest_json(processor):
+        for frame in legacy:
+            message = json.loads(frame)
+            processor.write_audio(base64.b64decode(message.get("audio", "")))
+
+    rates = {}
+    for name, ingest in (("binary", ingest_binary), ("json", ingest_json)):
+        processor = AudioProcessor(capacity=FRAMES * FRAME_BYTES)
+        started = time.process_time()
+        ingest(processor)
+        rates[name] = FRAMES / (time.process_time() - started)
+
+    report(
+        binary_frames_per_core_second=rates["binary"],
+        json_frames_per_core_second=rates["json"],
+        binary_wire_bytes=len(binary[0]),
+        json_wire_bytes=len(legacy[0]),
+    )
+    assert rates["binary"] > rates["json"]
+    assert len(binary[0]) < len(legacy[0]) * 0.8
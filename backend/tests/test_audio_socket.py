@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+import websockets
+
+from shared_state import connected_clients
+from websocket import audio_broadcast_handler
+
+
+async def _serve():
+    server = await websockets.serve(audio_broadcast_handler, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def _registered(user_id):
+    while user_id not in connected_clients.audio:
+        await asyncio.sleep(0.01)
+
+
+def test_audio_socket_registers_the_user_and_receives_binary_audio():
+    async def main():
+        server, port = await _serve()
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}/?user_id=42") as client:
+                await asyncio.wait_for(_registered("42"), 2)
+                assert connected_clients.send_audio("42", b"\xff\xfbmp3")
+                assert connected_clients.send_audio_control("42", {"type": "end_of_stream"})
+                frames = [await asyncio.wait_for(client.recv(), 2) for _ in range(2)]
+            # The handler unregisters the socket once the client goes away
+            for _ in range(200):
+                if "42" not in connected_clients.audio:
+                    break
+                await asyncio.sleep(0.01)
+            return frames
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    frames = asyncio.run(main())
+
+    assert frames == [b"\xff\xfbmp3", '{"type": "end_of_stream"}']
+    assert "42" not in connected_clients.audio
+
+
+def test_audio_socket_without_user_id_is_closed():
+    async def main():
+        server, port = await _serve()
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}/") as client:
+                with pytest.raises(websockets.ConnectionClosed) as closed:
+                    await asyncio.wait_for(client.recv(), 2)
+            return closed.value.rcvd.code
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    assert asyncio.run(main()) == 1008
+    assert not connected_clients.audio
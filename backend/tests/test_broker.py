@@ -0,0 +1,186 @@
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+import pytest
+
+import broker as broker_module
+from broker import RedisBroker
+from conftest import BACKEND_DIR
+from connections import Connection, ConnectionRegistry
+from resp_server import RespServer
+
+LATENCY_SAMPLES = 200
+
+# A second worker process holding "bob"; it echoes whatever reaches bob
+# back to "alice" and exits when its stdin closes
+WORKER_SCRIPT = """
+import asyncio, json, sys
+from broker import RedisBroker
+from connections import Connection, ConnectionRegistry
+
+async def main(url):
+    broker = RedisBroker(url)
+    registry = ConnectionRegistry()
+    await broker.start()
+    await registry.attach_broker(broker)
+
+    async def echo_text(text):
+        message = json.loads(text)
+        if message["type"] == "end_of_stream":
+            registry.send_audio_control("alice", message)
+        else:
+            registry.send_signal("alice", message)
+
+    async def echo_bytes(chunk):
+        registry.send_audio("alice", chunk)
+
+    connection = Connection(echo_text, echo_bytes, binary_audio=True)
+    registry.register_signaling("bob", connection)
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+    registry.unregister_signaling("bob", connection)
+    await broker.close()
+
+asyncio.run(main(sys.argv[1]))
+"""
+
+
+class Inbox:
+    """A socket that queues every frame it is sent."""
+
+    def __init__(self):
+        self.frames = asyncio.Queue()
+
+    async def send(self, frame):
+        self.frames.put_nowait(frame)
+
+    async def receive(self):
+        return await asyncio.wait_for(self.frames.get(), 5)
+
+
+async def _until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def _two_workers(exercise):
+    server = await RespServer().start()
+    worker = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        WORKER_SCRIPT,
+        server.url,
+        cwd=BACKEND_DIR,
+        stdin=asyncio.subprocess.PIPE,
+    )
+    broker = RedisBroker(server.url)
+    registry = ConnectionRegistry()
+    inbox = Inbox()
+    try:
+        await broker.start()
+        await registry.attach_broker(broker)
+        registry.register_signaling("alice", Connection(inbox.send, inbox.send, binary_audio=True))
+        await _until(lambda: registry.reachable("bob"))
+        result = await exercise(registry, inbox)
+        worker.stdin.close()
+        await asyncio.wait_for(worker.wait(), 10)
+        # Bob's worker announced he is gone
+        await _until(lambda: not registry.reachable("bob"))
+        return result, registry
+    finally:
+        if worker.returncode is None:
+            worker.kill()
+        await broker.close()
+        await server.close()
+
+
+def test_signaling_and_audio_reach_a_user_on_another_worker():
+    async def exercise(registry, inbox):
+        assert registry.send_signal("bob", {"type": "call_request", "from": "alice"})
+        assert registry.send_audio("bob", b"\xff\xfbmp3")
+        assert registry.send_audio_control("bob", {"type": "end_of_stream"})
+        # Users connected nowhere are reported, not published to
+        assert not registry.send_signal("carol", {"type": "call_request"})
+        assert not registry.send_audio("carol", b"\xff\xfb")
+        return [await inbox.receive() for _ in range(3)]
+
+    frames, registry = asyncio.run(_two_workers(exercise))
+
+    assert json.loads(frames[0]) == {"type": "call_request", "from": "alice"}
+    assert frames[1] == b"\xff\xfbmp3"
+    assert json.loads(frames[2]) == {"type": "end_of_stream"}
+    assert not registry.send_signal("bob", {"type": "call_ended"})
+
+
+@pytest.mark.benchmark
+def test_cross_worker_message_latency(report):
+    async def exercise(registry, inbox):
+        round_trips = []
+        for index in range(LATENCY_SAMPLES):
+            started = time.perf_counter()
+            registry.send_signal("bob", {"type": "ping", "index": index})
+            assert json.loads(await inbox.receive())["index"] == index
+            round_trips.append(time.perf_counter() - started)
+        return round_trips
+
+    round_trips, _ = asyncio.run(_two_workers(exercise))
+
+    # Each round trip crosses the broker twice
+    one_way = sorted(seconds / 2 for seconds in round_trips)
+    p50 = statistics.median(one_way)
+    p99 = one_way[int(len(one_way) * 0.99) - 1]
+    report(samples=len(one_way), p50_ms=p50 * 1000, p99_ms=p99 * 1000)
+    assert p50 < 0.05
+
+
+def test_broker_reconnects_and_retries_after_the_server_goes_away(monkeypatch):
+    monkeypatch.setattr(broker_module, "BROKER_RECONNECT_DELAY", 0.05)
+
+    async def main():
+        server = await RespServer().start()
+        url, port = server.url, int(server.url.rsplit(":", 1)[1])
+        broker = RedisBroker(url)
+        received = []
+        await broker.start()
+        await broker.subscribe("user:bob", received.append)
+        try:
+            broker.publish("user:bob", b"before")
+            await _until(lambda: received == [b"before"])
+            await server.close()
+            # Control messages wait for the server instead of being lost
+            broker.publish("user:bob", b"during")
+            await asyncio.sleep(0.3)
+            assert broker.queued == 1
+            server = await RespServer().start(port)
+            await _until(lambda: broker.reconnects == 1 and broker.queued == 0)
+            broker.publish("user:bob", b"after")
+            await _until(lambda: received[-1:] == [b"after"])
+            return received, broker.dropped
+        finally:
+            await broker.close()
+            await server.close()
+
+    received, dropped = asyncio.run(main())
+    assert received[0] == b"before"
+    assert dropped == 0
+
+
+def test_full_broker_queue_sheds_only_audio():
+    async def main():
+        broker = RedisBroker("redis://unused", max_queue=3)
+        broker.publish("user:bob", b"a1", droppable=True)
+        broker.publish("user:bob", b"s1")
+        broker.publish("user:bob", b"a2", droppable=True)
+        broker.publish("calls", b"accept")
+        broker.publish("user:bob", b"c1")
+        broker.publish("calls", b"end")
+        return [message for _, message, _ in broker._queue], broker.dropped
+
+    queued, dropped = asyncio.run(main())
+
+    assert queued == [b"s1", b"accept", b"c1", b"end"]
+    assert dropped == 2
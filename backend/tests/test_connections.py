@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from connections import Connection
+
+# A 10 s utterance of 128 kbit/s MP3 in the chunk size ElevenLabs streams
+UTTERANCE_BYTES = 10 * 128_000 // 8
+CHUNK_BYTES = 4096
+UTTERANCES = 50
+
+
+class SlowSocket:
+    """Records frames; blocks every send until released."""
+
+    def __init__(self):
+        self.frames = []
+        self.open = asyncio.Event()
+
+    async def send(self, frame):
+        await self.open.wait()
+        self.frames.append(frame)
+
+
+async def _drain(socket, connection):
+    socket.open.set()
+    while connection.queued:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def test_control_messages_survive_a_slow_listener():
+    async def main():
+        socket = SlowSocket()
+        connection = Connection(socket.send, socket.send, binary_audio=True, max_queue=4)
+        connection.send_json({"type": "call_accepted"})
+        for utterance in range(3):
+            for index in range(3):
+                connection.send_audio(f"{utterance}:{index}".encode())
+            connection.end_audio({"type": "end_of_stream"})
+        connection.send_json({"type": "call_ended"})
+        await _drain(socket, connection)
+        connection.close()
+        return socket.frames, connection
+
+    frames, connection = asyncio.run(main())
+
+    controls = [json.loads(frame)["type"] for frame in frames if isinstance(frame, str)]
+    assert controls == ["call_accepted"] + ["end_of_stream"] * 3 + ["call_ended"]
+    audio = [frame.decode() for frame in frames if isinstance(frame, bytes)]
+    # Only the newest utterance fits; older ones are dropped whole
+    assert audio == ["2:0", "2:1", "2:2"]
+    assert connection.dropped == 6
+    assert connection.dropped_utterances == 2
+
+
+def test_overflowing_utterance_is_dropped_whole():
+    async def main():
+        socket = SlowSocket()
+        connection = Connection(socket.send, socket.send, binary_audio=True, max_queue=2)
+        for index in range(5):
+            connection.send_audio(f"0:{index}".encode())
+        connection.end_audio({"type": "end_of_stream"})
+        connection.send_audio(b"1:0")
+        connection.end_audio({"type": "end_of_stream"})
+        await _drain(socket, connection)
+        connection.close()
+        return socket.frames
+
+    frames = asyncio.run(main())
+
+    audio = [frame.decode() for frame in frames if isinstance(frame, bytes)]
+    # No fragment of the first utterance is played; the next one is intact
+    assert audio == ["1:0"]
+    assert sum(isinstance(frame, str) for frame in frames) == 2
+
+
+class CountingSocket:
+    """Accepts every frame at once and counts what would go on the wire."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send(self, frame):
+        self.frames += 1
+        self.bytes += len(frame)
+
+
+@pytest.mark.benchmark
+def test_fan_out_chunks_per_second_and_bytes_on_the_wire(report):
+    audio = os.urandom(UTTERANCE_BYTES)
+    chunks = [audio[start : start + CHUNK_BYTES] for start in range(0, len(audio), CHUNK_BYTES)]
+
+    async def fan_out(binary_audio):
+        socket = CountingSocket()
+        connection = Connection(
+            socket.send, socket.send, binary_audio=binary_audio, max_queue=len(chunks)
+        )
+        started = time.process_time()
+        for _ in range(UTTERANCES):
+            for chunk in chunks:
+                connection.send_audio(chunk)
+            connection.end_audio({"type": "end_of_stream"})
+            while connection.queued:
+                await asyncio.sleep(0)
+        elapsed = time.process_time() - started
+        connection.close()
+        return socket, elapsed
+
+    results = {
+        name: asyncio.run(fan_out(binary_audio))
+        for name, binary_audio in (("binary", True), ("json", False))
+    }
+
+    figures = {}
+    for name, (socket, elapsed) in results.items():
+        figures[f"{name}_chunks_per_second"] = UTTERANCES * len(chunks) / elapsed
+        figures[f"{name}_wire_bytes_per_utterance"] = socket.bytes // UTTERANCES
+    report(chunks_per_utterance=len(chunks), **figures)
+    # Raw frames skip the base64 third and the JSON wrapper
+    assert figures["binary_wire_bytes_per_utterance"] < UTTERANCE_BYTES * 1.01
+    assert figures["json_wire_bytes_per_utterance"] > UTTERANCE_BYTES * 1.33
+    assert figures["binary_chunks_per_second"] > figures["json_chunks_per_second"]
@@ -0,0 +1,71 @@
+import asyncio
+
+from sqlalchemy import text
+
+from audio_processor import AudioProcessor
+from db import async_db_url, db_connection, pool_status
+
+FRAME_BYTES = 640  # 10 ms of 16 kHz float32
+FRAME_INTERVAL = 0.01
+
+# Counts to a few million inside SQLite: a query that takes a while
+SLOW_QUERY = text(
+    """
+    WITH RECURSIVE counter(x) AS (
+        SELECT 1 UNION ALL SELECT x + 1 FROM counter WHERE x < 3000000
+    )
+    SELECT count(*) FROM counter
+    """
+)
+
+
+def test_async_db_url_picks_async_drivers():
+    assert async_db_url("postgresql://u:p@h/db?sslmode=require") == (
+        "postgresql+asyncpg://u:p@h/db?ssl=require"
+    )
+    assert async_db_url("postgres://h/db") == "postgresql+asyncpg://h/db"
+    assert async_db_url("sqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+def test_audio_keeps_flowing_while_slow_queries_run():
+    async def main():
+        loop = asyncio.get_running_loop()
+        processor = AudioProcessor()
+        arrivals = []
+        querying = True
+
+        async def slow_queries():
+            nonlocal querying
+            started = loop.time()
+            for _ in range(2):
+                async with db_connection() as conn:
+                    await conn.execute(SLOW_QUERY)
+            querying = False
+            return loop.time() - started
+
+        async def microphone():
+            while querying:
+                processor.write_audio(bytes(FRAME_BYTES))
+                await asyncio.sleep(FRAME_INTERVAL)
+            processor.close()
+
+        async def transcriber():
+            while True:
+                chunk = await processor.read(FRAME_BYTES)
+                if not chunk:
+                    return
+                arrivals.append(loop.time())
+
+        query_seconds, _, _ = await asyncio.gather(
+            slow_queries(), microphone(), transcriber()
+        )
+        return query_seconds, arrivals
+
+    query_seconds, arrivals = asyncio.run(main())
+
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    # The queries ran long enough that a blocked loop would show up as a gap
+    assert query_seconds > 0.2
+    assert len(arrivals) >= query_seconds / FRAME_INTERVAL / 2
+    assert max(gaps) < 0.1
+    assert pool_status()["checkouts"] >= 2
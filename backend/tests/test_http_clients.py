@@ -0,0 +1,174 @@
+import asyncio
+import json
+import statistics
+import time
+import weakref
+
+import aiohttp
+import pytest
+from aiohttp import web
+from openai import AsyncOpenAI
+
+from http_clients import OPENAI_ORGANIZATION, OPENAI_PROJECT, HTTPClients
+
+UTTERANCES = 50
+# Each new connection waits this long before its first response, standing
+# in for the TCP and TLS round trips to a remote API
+UPSTREAM_CONNECT_SECONDS = 0.03
+TOKENS = ["Hola", ",", " ¿qué", " tal", "?"]
+
+
+class StubUpstream:
+    """Streams a chat completion and accepts voice uploads, like the OpenAI
+    and ElevenLabs endpoints, counting the connections it is opened on."""
+
+    def __init__(self):
+        self.connections = 0
+        self._seen = weakref.WeakSet()
+
+    async def _connect(self, request):
+        if request.transport not in self._seen:
+            self._seen.add(request.transport)
+            self.connections += 1
+            await asyncio.sleep(UPSTREAM_CONNECT_SECONDS)
+
+    async def completions(self, request):
+        await self._connect(request)
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in TOKENS:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "gpt-3.5-turbo",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def add_voice(self, request):
+        await self._connect(request)
+        await request.post()
+        return web.json_response({"voice_id": "voice"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.completions)
+        app.router.add_post("/v1/voices/add", self.add_voice)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+
+async def _translate(client, started):
+    """The LLM call translate_text_stream makes; returns seconds from started
+    to the first token and to the end."""
+    first = None
+    response = await client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": "Translate"}],
+        stream=True,
+    )
+    async for chunk in response:
+        if first is None and chunk.choices[0].delta.content:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+async def _add_voice(session, url):
+    form_data = aiohttp.FormData()
+    form_data.add_field("name", "voice")
+    form_data.add_field("files", b"\0" * 1024, filename="recording.webm")
+    async with session.post(f"{url}/v1/voices/add", data=form_data) as response:
+        return (await response.json())["voice_id"]
+
+
+async def _per_call_clients(stub):
+    """Before pooling: a new AsyncOpenAI per utterance, a new session per upload."""
+    timings = []
+    for _ in range(UTTERANCES):
+        started = time.perf_counter()
+        client = AsyncOpenAI(organization=OPENAI_ORGANIZATION, project=OPENAI_PROJECT)
+        timings.append(await _translate(client, started))
+        await client.close()
+    started = time.perf_counter()
+    for _ in range(UTTERANCES):
+        async with aiohttp.ClientSession() as session:
+            await _add_voice(session, stub.url)
+    return timings, time.perf_counter() - started
+
+
+async def _pooled_clients(stub):
+    clients = HTTPClients()
+    try:
+        timings = [
+            await _translate(clients.openai, time.perf_counter()) for _ in range(UTTERANCES)
+        ]
+        started = time.perf_counter()
+        for _ in range(UTTERANCES):
+            await _add_voice(clients.session, stub.url)
+        return timings, time.perf_counter() - started
+    finally:
+        await clients.close()
+
+
+def _run(measure, monkeypatch):
+    async def main():
+        stub = await StubUpstream().start()
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{stub.url}/v1")
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        try:
+            return (*await measure(stub), stub.connections)
+        finally:
+            await stub.runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_clients_are_created_lazily_and_reopened_after_close(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def main():
+        clients = HTTPClients()
+        assert clients._openai is None and clients._session is None
+        first = clients.session
+        assert clients.openai is clients.openai
+        await clients.close()
+        second = clients.session
+        await clients.close()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first is not second and first.closed and second.closed
+
+
+@pytest.mark.benchmark
+def test_per_utterance_overhead_with_pooled_clients(monkeypatch, report):
+    before, before_uploads, before_connections = _run(_per_call_clients, monkeypatch)
+    after, after_uploads, after_connections = _run(_pooled_clients, monkeypatch)
+
+    report(
+        utterances=UTTERANCES,
+        per_call_first_token_ms=statistics.mean(first for first, _ in before) * 1000,
+        pooled_first_token_ms=statistics.mean(first for first, _ in after) * 1000,
+        per_call_completion_ms=statistics.mean(total for _, total in before) * 1000,
+        pooled_completion_ms=statistics.mean(total for _, total in after) * 1000,
+        per_call_upload_ms=before_uploads / UTTERANCES * 1000,
+        pooled_upload_ms=after_uploads / UTTERANCES * 1000,
+        per_call_connections=before_connections,
+        pooled_connections=after_connections,
+    )
+    # One connection per upstream for the whole run instead of one per call
+    assert before_connections == 2 * UTTERANCES
+    assert after_connections == 2
+    assert statistics.mean(first for first, _ in after) < statistics.mean(
+        first for first, _ in before
+    )
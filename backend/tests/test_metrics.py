@@ -0,0 +1,46 @@
+import asyncio
+
+import metrics
+from audio_processor import AudioProcessor
+from connections import Connection
+
+
+def _value(lines, name):
+    return float(next(line for line in lines if line.startswith(name + " ")).split()[1])
+
+
+def test_drop_counters_survive_closed_sessions():
+    audio_before = metrics.audio_dropped_bytes.value
+    outbound_before = metrics.outbound_dropped_messages.value
+
+    processor = AudioProcessor(capacity=100)
+    processor.write_audio(bytes(150))
+    processor.close()
+    del processor
+
+    async def slow_listener():
+        async def never(message):
+            await asyncio.Event().wait()
+
+        connection = Connection(never, never, binary_audio=True, max_queue=2)
+        for _ in range(4):
+            connection.send_audio(b"chunk")
+        connection.close()
+
+    asyncio.run(slow_listener())
+
+    lines = metrics.audio_dropped_bytes.render() + metrics.outbound_dropped_messages.render()
+    assert "# TYPE audio_buffer_dropped_bytes_total counter" in lines
+    assert _value(lines, "audio_buffer_dropped_bytes_total") == audio_before + 50
+    assert _value(lines, "outbound_dropped_messages_total") > outbound_before
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test", labelnames=("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, "x")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="x",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="x",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="x"} 3' in lines
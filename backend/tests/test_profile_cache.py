@@ -0,0 +1,96 @@
+import asyncio
+
+from sqlalchemy import event, text
+
+from db import db_connection, engine
+from profile_cache import ProfileCache, get_user_profile, profile_cache
+
+
+async def _create_users():
+    async with db_connection() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS users "
+                "(id INTEGER PRIMARY KEY, first_name TEXT, language_code TEXT)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS voices "
+                "(id INTEGER PRIMARY KEY, external_id TEXT, user_id INTEGER, created_at TIMESTAMP)"
+            )
+        )
+        await conn.execute(text("DELETE FROM users"))
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, first_name, language_code) "
+                "VALUES (1, 'Ana', 'es'), (2, 'Ben', 'en')"
+            )
+        )
+        await conn.commit()
+
+
+def _count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(
+        engine.sync_engine, "before_cursor_execute", record
+    )
+
+
+def test_warm_session_setup_makes_no_db_round_trips():
+    async def session_setup():
+        # What /ws looks up when a call opens: the speaker and their peer
+        speaker = await get_user_profile("1")
+        peer = await get_user_profile("2")
+        return speaker, peer
+
+    async def main():
+        await _create_users()
+        profile_cache.invalidate("1")
+        profile_cache.invalidate("2")
+        statements, stop = _count_statements()
+        try:
+            cold = await session_setup()
+            cold_statements = len(statements)
+            warm = await session_setup()
+            warm_statements = len(statements) - cold_statements
+        finally:
+            stop()
+        return cold, warm, cold_statements, warm_statements
+
+    cold, warm, cold_statements, warm_statements = asyncio.run(main())
+
+    assert cold_statements > 0
+    assert warm_statements == 0
+    assert warm == cold
+    assert warm[0]["language_code"] == "es"
+    assert warm[1]["voice"] is None
+
+
+def test_updates_and_invalidation_apply_immediately():
+    cache = ProfileCache(max_entries=2, ttl=60)
+    cache.put("1", {"language_code": "es", "voice": None})
+    cache.update("1", language_code="fr")
+    assert cache.get("1")["language_code"] == "fr"
+
+    cache.invalidate("1")
+    assert cache.get("1") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_and_ttl():
+    cache = ProfileCache(max_entries=2, ttl=60)
+    for user_id in ("1", "2", "3"):
+        cache.put(user_id, {"id": user_id})
+    assert cache.get("1") is None
+    assert cache.get("3") == {"id": "3"}
+
+    expired = ProfileCache(ttl=-1)
+    expired.put("1", {"id": "1"})
+    assert expired.get("1") is None
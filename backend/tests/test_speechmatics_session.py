@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+
+import pytest
+import websockets
+
+from audio_processor import AudioProcessor
+from services.speech_to_text.speechmatics_client import SpeechmaticsClient
+
+UTTERANCES = 1000
+CONCURRENT_SESSIONS = 500
+BYTES_PER_SECOND = 16000 * 2  # pcm_s16le
+
+
+def _open_sockets() -> int:
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+class FakeSpeechmatics:
+    """Enough of the RT v2 protocol for one client: every audio message is
+    answered with a final transcript ending where the audio so far ends."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.active = 0
+        self.peak_active = 0
+
+    async def handle(self, websocket):
+        self.sessions += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await self._serve(websocket)
+        finally:
+            self.active -= 1
+
+    async def _serve(self, websocket):
+        received = 0
+        seq_no = 0
+        async for message in websocket:
+            if isinstance(message, bytes):
+                received += len(message)
+                seq_no += 1
+                await websocket.send(
+                    json.dumps(
+                        {
+                            "message": "AddTranscript",
+                            "metadata": {
+                                "transcript": "hello",
+                                "start_time": 0.0,
+                                "end_time": received / BYTES_PER_SECOND,
+                            },
+                        }
+                    )
+                )
+                continue
+            data = json.loads(message)
+            if data["message"] == "StartRecognition":
+                await websocket.send(json.dumps({"message": "RecognitionStarted"}))
+            elif data["message"] == "EndOfStream":
+                await websocket.send(json.dumps({"message": "EndOfTranscript"}))
+
+
+def test_one_session_serves_many_utterances_without_leaks():
+    async def main():
+        threads_before = threading.active_count()
+        sockets_before = _open_sockets()
+        fake = FakeSpeechmatics()
+        server = await websockets.serve(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        transcripts = []
+        client = SpeechmaticsClient(
+            api_key="test",
+            connection_url=f"ws://127.0.0.1:{port}",
+            on_transcript=transcripts.append,
+        )
+        client.utterance_padding = 0.05
+
+        processor = AudioProcessor()
+        task = asyncio.create_task(client.transcribe_audio_stream(processor))
+
+        samples = []
+        for index in range(UTTERANCES):
+            processor.write_audio(bytes(BYTES_PER_SECOND // 10))
+            assert await client.flush(processor, timeout=5)
+            if index in (9, UTTERANCES - 1):
+                samples.append((threading.active_count(), _open_sockets()))
+
+        processor.close()
+        await asyncio.wait_for(task, 5)
+        server.close()
+        await server.wait_closed()
+        after = (threading.active_count(), _open_sockets())
+        return fake.sessions, transcripts, threads_before, sockets_before, samples, after
+
+    sessions, transcripts, threads_before, sockets_before, samples, after = asyncio.run(main())
+
+    assert sessions == 1
+    assert len(transcripts) >= UTTERANCES
+    # Flat across the session: no thread or socket per utterance
+    (threads_early, sockets_early), (threads_late, sockets_late) = samples
+    assert threads_late == threads_early == threads_before
+    assert sockets_late == sockets_early
+    # ...and nothing left behind once it closes
+    assert after == (threads_before, sockets_before)
+
+
+@pytest.mark.benchmark
+def test_concurrent_sessions_share_the_event_loop(report):
+    async def session(port, go):
+        transcripts = []
+        client = SpeechmaticsClient(
+            api_key="test",
+            connection_url=f"ws://127.0.0.1:{port}",
+            on_transcript=transcripts.append,
+        )
+        client.utterance_padding = 0.05
+        processor = AudioProcessor()
+        task = asyncio.create_task(client.transcribe_audio_stream(processor))
+        await go.wait()
+        latencies = []
+        for _ in range(3):
+            processor.write_audio(bytes(BYTES_PER_SECOND // 10))
+            started = time.perf_counter()
+            assert await client.flush(processor, timeout=30)
+            latencies.append(time.perf_counter() - started)
+        processor.close()
+        await asyncio.wait_for(task, 30)
+        return transcripts, latencies
+
+    async def main():
+        threads_before = threading.active_count()
+        fake = FakeSpeechmatics()
+        server = await websockets.serve(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        go = asyncio.Event()
+        started = time.perf_counter()
+        sessions = [asyncio.create_task(session(port, go)) for _ in range(CONCURRENT_SESSIONS)]
+        # Every session connected before any of them sends audio
+        while fake.active < CONCURRENT_SESSIONS:
+            await asyncio.sleep(0.01)
+        connected = time.perf_counter() - started
+        threads_during = threading.active_count()
+        go.set()
+        results = await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - started
+        server.close()
+        await server.wait_closed()
+        return fake, results, connected, elapsed, threads_before, threads_during
+
+    fake, results, connected, elapsed, threads_before, threads_during = asyncio.run(main())
+
+    latencies = sorted(latency for _, per_session in results for latency in per_session)
+    report(
+        sessions=CONCURRENT_SESSIONS,
+        connect_all_seconds=connected,
+        total_seconds=elapsed,
+        flush_p50_ms=statistics.median(latencies) * 1000,
+        flush_p95_ms=latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    )
+    # All sessions open at once, none queued behind an executor's threads
+    assert fake.peak_active == CONCURRENT_SESSIONS
+    assert threads_during == threads_before
+    assert all(len(transcripts) >= 3 for transcripts, _ in results)
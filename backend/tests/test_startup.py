@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+# Cumulative `import main` time; fastapi alone accounts for about half of
+# it, the rest should stay small. Override on slow machines.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+STARTUP_BUDGET_SECONDS = 0.5
+
+# Provider SDKs and heavy engines that must only load on first use
+LAZY_MODULES = ("openai", "httpx", "aiohttp", "faster_whisper", "ctranslate2", "redis")
+
+STARTUP_SCRIPT = """
+import asyncio, json, socket, sys, time
+
+attempts = []
+
+def refuse(*args, **kwargs):
+    attempts.append(repr(args[1:] or args))
+    raise OSError("outbound network is disabled during startup")
+
+socket.socket.connect = refuse
+socket.getaddrinfo = refuse
+
+import main
+
+async def start_and_stop():
+    started = time.perf_counter()
+    async with main.lifespan(main.app):
+        ready = time.perf_counter() - started
+    return ready
+
+ready = asyncio.run(start_and_stop())
+print(json.dumps({
+    "startup_seconds": ready,
+    "network": attempts,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def _import_times(stderr: str) -> dict:
+    """Cumulative seconds per top-level module from -X importtime output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_import_and_startup_stay_within_budget():
+    env = dict(os.environ)
+    env.pop("BROKER_URL", None)
+    # Warm the bytecode cache so the budget measures imports, not compilation
+    subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, env=env, check=True)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    import_seconds = _import_times(result.stderr)["main"]
+
+    assert report["network"] == []
+    assert report["loaded"] == []
+    assert import_seconds < IMPORT_BUDGET_SECONDS
+    assert report["startup_seconds"] < STARTUP_BUDGET_SECONDS
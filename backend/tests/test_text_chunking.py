@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from text_chunking import text_chunker
+
+STREAMS = {
+    "english": ["Hello", ",", " world", ".", " How", " are", " you", "?", " 3", ".5", " km"],
+    "chinese": ["你好", "，", "世界", "。", "今天", "天气", "很好", "。"],
+    "japanese": ["こんにちは", "。", "元気", "です", "か", "？"],
+    "thai": ["สวัสดี", "ครับ", " ", "วันนี้", "อากาศ", "ดี", "มาก"],
+}
+
+
+def _chunks(tokens, delay=0.0, **policy):
+    async def stream():
+        for token in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            yield token
+
+    async def main():
+        return [chunk async for chunk in text_chunker(stream(), **policy)]
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("language", sorted(STREAMS))
+@pytest.mark.parametrize("flush_on", ["sentence", "clause", "word"])
+@pytest.mark.parametrize("max_wait_ms", [0, 5])
+def test_chunks_reassemble_to_the_original_text(language, flush_on, max_wait_ms):
+    tokens = STREAMS[language]
+    chunks = _chunks(tokens, delay=0.004, flush_on=flush_on, min_chars=4, max_wait_ms=max_wait_ms)
+
+    text = "".join(tokens)
+    # Nothing inserted, dropped or reordered; at most one space at the end
+    assert "".join(chunks) in (text, text + " ")
+    assert all(chunk.strip() for chunk in chunks)
+
+
+def test_cjk_chunks_gain_no_spaces():
+    chunks = _chunks(STREAMS["chinese"], flush_on="clause", min_chars=2, max_wait_ms=0)
+    assert chunks == ["你好，", "世界。", "今天天气很好。"]
+
+
+def test_spaced_chunks_end_with_a_space():
+    chunks = _chunks(STREAMS["english"], flush_on="sentence", min_chars=4, max_wait_ms=0)
+    assert chunks == ["Hello, world. ", "How are you? ", "3.5 km "]
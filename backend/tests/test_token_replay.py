@@ -0,0 +1,166 @@
+"""Replays recorded LLM token streams through text_chunker into a paced TTS stub.
+
+Each policy (flush_on, min_chars, max_wait_ms) is scored on the messages
+it sends, TTS time-to-first-audio and the time until the last audio
+arrives, all measured from the first token. The stub synthesizes one
+message at a time per connection at a fixed cost per message plus a cost
+per character, so many tiny messages and long held-back ones both show.
+Set TOKEN_STREAMS_FILE to a JSON object of {name: [[gap_ms, token], ...]}
+to replay captured streams instead of the built-in ones.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+
+import pytest
+import websockets
+
+import tts_sessions
+from test_text_chunking import STREAMS
+from text_chunking import TTS_FLUSH_ON, TTS_MAX_WAIT_MS, TTS_MIN_CHARS, text_chunker
+from tts_sessions import TTSSessionManager
+
+TOKEN_STREAMS_FILE = os.getenv("TOKEN_STREAMS_FILE", "")
+# Roughly what a streaming chat completion delivers
+TOKEN_GAP_MS = 30
+TTS_MESSAGE_SECONDS = 0.04
+TTS_CHAR_SECONDS = 0.0005
+
+PARAGRAPH = (
+    "Thanks for calling back. I checked with the team, and the delivery is"
+    " scheduled for Thursday morning; if that doesn't work, we can move it"
+    " to Friday afternoon. Would you like me to confirm it now?"
+)
+POLICIES = [
+    ("sentence", TTS_MIN_CHARS, 0),
+    ("sentence", TTS_MIN_CHARS, TTS_MAX_WAIT_MS),
+    (TTS_FLUSH_ON, TTS_MIN_CHARS, TTS_MAX_WAIT_MS),
+    ("clause", 4, TTS_MAX_WAIT_MS),
+    ("word", 4, 0),
+    ("word", TTS_MIN_CHARS, TTS_MAX_WAIT_MS),
+]
+
+
+def _recordings():
+    if TOKEN_STREAMS_FILE:
+        with open(TOKEN_STREAMS_FILE) as f:
+            return {name: [(gap, token) for gap, token in tokens] for name, tokens in json.load(f).items()}
+    tokens = {name: list(stream) for name, stream in STREAMS.items()}
+    words = PARAGRAPH.split(" ")
+    tokens["paragraph"] = words[:1] + [" " + word for word in words[1:]]
+    return {name: [(TOKEN_GAP_MS, token) for token in stream] for name, stream in tokens.items()}
+
+
+class PacedTTS:
+    """Multi-context stream-input server that speaks each message after a
+    synthesis delay, one message at a time per connection."""
+
+    def __init__(self):
+        self.messages = 0
+
+    async def handle(self, websocket):
+        queue = asyncio.Queue()
+        synthesizer = asyncio.create_task(self._synthesize(websocket, queue))
+        try:
+            async for message in websocket:
+                data = json.loads(message)
+                if data.get("close_socket"):
+                    break
+                if data.get("text", " ").strip():
+                    self.messages += 1
+                queue.put_nowait(data)
+        finally:
+            synthesizer.cancel()
+
+    async def _synthesize(self, websocket, queue):
+        while True:
+            data = await queue.get()
+            context_id = data.get("context_id")
+            text = data.get("text", " ")
+            if text.strip():
+                await asyncio.sleep(TTS_MESSAGE_SECONDS + TTS_CHAR_SECONDS * len(text))
+                audio = base64.b64encode(text.encode()).decode()
+                await websocket.send(json.dumps({"audio": audio, "contextId": context_id}))
+            if data.get("close_context"):
+                await websocket.send(json.dumps({"isFinal": True, "contextId": context_id}))
+
+
+async def _replay(manager, voice_id, recording, policy):
+    """Speak one recording the way text_to_speech_input_streaming does."""
+    flush_on, min_chars, max_wait_ms = policy
+    marks = {}
+
+    async def tokens():
+        for gap_ms, token in recording:
+            await asyncio.sleep(gap_ms / 1000)
+            marks.setdefault("first_token", time.perf_counter())
+            yield token
+
+    async def listen(context):
+        audio = []
+        async for chunk in context.audio():
+            marks.setdefault("first_audio", time.perf_counter())
+            audio.append(chunk)
+        marks["last_audio"] = time.perf_counter()
+        return b"".join(audio).decode()
+
+    async with manager.context(voice_id) as context:
+        listener = asyncio.create_task(listen(context))
+        async for chunk in text_chunker(
+            tokens(), flush_on=flush_on, min_chars=min_chars, max_wait_ms=max_wait_ms
+        ):
+            await context.send(chunk)
+        await context.end()
+        spoken = await listener
+
+    return (
+        spoken,
+        marks["first_audio"] - marks["first_token"],
+        marks["last_audio"] - marks["first_token"],
+    )
+
+
+def _run(recordings, policy, monkeypatch):
+    async def main():
+        fake = PacedTTS()
+        server = await websockets.serve(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(tts_sessions, "ELEVENLABS_WS_URL", f"ws://127.0.0.1:{port}")
+        manager = TTSSessionManager(api_key="test")
+        try:
+            # Warm connections first so no stream pays for a handshake
+            for name in recordings:
+                await manager.warm(name)
+            results = await asyncio.gather(
+                *(_replay(manager, name, recording, policy) for name, recording in recordings.items())
+            )
+            return fake.messages, dict(zip(recordings, results))
+        finally:
+            await manager.close()
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("policy", POLICIES, ids=lambda policy: "-".join(map(str, policy)))
+def test_token_stream_replay(policy, report, monkeypatch):
+    recordings = _recordings()
+    messages, results = _run(recordings, policy, monkeypatch)
+
+    report(
+        streams=len(recordings),
+        messages_sent=messages,
+        first_audio_ms=statistics.mean(first for _, first, _ in results.values()) * 1000,
+        first_audio_max_ms=max(first for _, first, _ in results.values()) * 1000,
+        last_audio_ms=statistics.mean(last for _, _, last in results.values()) * 1000,
+    )
+    # Every policy speaks exactly the recorded text
+    for name, (spoken, _, _) in results.items():
+        text = "".join(token for _, token in recordings[name])
+        assert spoken in (text, text + " ")
@@ -0,0 +1,86 @@
+import asyncio
+import sys
+import threading
+
+from translation_cache import TranslationCache, normalize_text
+
+LOOKUPS = 20000
+
+
+def test_normalized_keys_share_an_entry():
+    assert normalize_text("  Can you HEAR me? ") == "can you hear me?"
+
+    async def main():
+        cache = TranslationCache()
+        cache.put("Yes", "en", "es", "Sí", elapsed=0.8)
+        return await cache.get("  yes ", "en", "es"), await cache.get("yes", "en", "fr"), cache
+
+    hit, other_pair, cache = asyncio.run(main())
+    assert hit == "Sí"
+    assert other_pair is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["latency_saved_seconds"] == 0.8
+
+
+def test_sqlite_tier_stays_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "translations.db")
+    writer = TranslationCache(path=path)
+    writer.put("Good morning", "en", "de", "Guten Morgen")
+    writer.close()
+
+    reader = TranslationCache(path=path)
+    threads = []
+    load = reader._load
+    monkeypatch.setattr(
+        reader, "_load", lambda key: threads.append(threading.current_thread()) or load(key)
+    )
+
+    async def main():
+        loop_thread = threading.current_thread()
+        return loop_thread, await reader.get("good morning", "en", "de")
+
+    loop_thread, translation = asyncio.run(main())
+    reader.close()
+
+    assert translation == "Guten Morgen"
+    assert reader.stats()["disk_hits"] == 1
+    assert threads and all(thread is not loop_thread for thread in threads)
+
+
+def test_memory_tier_is_safe_across_threads_and_the_loop():
+    # Switch threads as often as possible to provoke interleaving
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    cache = TranslationCache(max_entries=8)
+    errors = []
+
+    def worker(offset):
+        try:
+            for index in range(LOOKUPS):
+                text = f"phrase {(index + offset) % 16}"
+                cache.put(text, "en", "es", text.upper())
+                cache.get_blocking(text, "en", "es")
+        except Exception as e:
+            errors.append(e)
+
+    async def main():
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for index in range(LOOKUPS):
+            text = f"phrase {index % 16}"
+            cache.put(text, "en", "es", text.upper())
+            await cache.get(text, "en", "es")
+        for thread in threads:
+            thread.join()
+
+    try:
+        asyncio.run(main())
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    stats = cache.stats()
+    assert stats["entries"] <= 8
+    assert stats["hits"] + stats["misses"] == 5 * LOOKUPS
@@ -0,0 +1,98 @@
+import asyncio
+import base64
+import json
+
+import websockets
+
+import tts_sessions
+from tts_sessions import TTSSessionManager
+
+
+class FakeTTS:
+    """Multi-context stream-input server: each text message comes back as
+    its own bytes of "audio", and closing a context marks it final."""
+
+    def __init__(self):
+        self.connections = 0
+        self.paths = []
+
+    async def handle(self, websocket):
+        self.connections += 1
+        self.paths.append(websocket.request.path)
+        async for message in websocket:
+            data = json.loads(message)
+            context_id = data.get("context_id")
+            if data.get("close_socket"):
+                break
+            if data.get("text", " ").strip():
+                audio = base64.b64encode(data["text"].encode()).decode()
+                await websocket.send(json.dumps({"audio": audio, "contextId": context_id}))
+            if data.get("close_context"):
+                await websocket.send(json.dumps({"isFinal": True, "contextId": context_id}))
+
+
+async def _speak(manager, text, voice_id="voice"):
+    async with manager.context(voice_id) as context:
+        await context.send(text)
+        await context.end()
+        return b"".join([chunk async for chunk in context.audio()]), context.completed
+
+
+def _run(exercise, monkeypatch, **manager_options):
+    async def main():
+        fake = FakeTTS()
+        server = await websockets.serve(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(tts_sessions, "ELEVENLABS_WS_URL", f"ws://127.0.0.1:{port}")
+        manager = TTSSessionManager(api_key="test", **manager_options)
+        try:
+            return fake, manager, await exercise(manager)
+        finally:
+            await manager.close()
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(main())
+
+
+def test_utterances_reuse_one_connection_per_voice(monkeypatch):
+    async def exercise(manager):
+        return [await _speak(manager, text) for text in ("Hola. ", "¿Qué tal? ")]
+
+    fake, manager, results = _run(exercise, monkeypatch)
+
+    assert results == [("Hola. ".encode(), True), ("¿Qué tal? ".encode(), True)]
+    assert fake.connections == 1
+    assert fake.paths[0].startswith("/v1/text-to-speech/voice/multi-stream-input")
+    stats = manager.stats()
+    assert (stats["connects"], stats["reuses"]) == (1, 1)
+
+
+def test_concurrent_contexts_share_a_connection(monkeypatch):
+    async def exercise(manager):
+        return await asyncio.gather(*(_speak(manager, f"frase {index}. ") for index in range(5)))
+
+    fake, manager, results = _run(exercise, monkeypatch)
+
+    # One handshake for all of them, and each context hears only its own audio
+    assert fake.connections == 1
+    assert [audio for audio, _ in results] == [f"frase {index}. ".encode() for index in range(5)]
+    assert all(completed for _, completed in results)
+
+
+def test_idle_connection_is_closed_after_the_ttl_and_reopened(monkeypatch):
+    async def exercise(manager):
+        first = await _speak(manager, "uno ")
+        await asyncio.sleep(0.2)
+        # Reaped while idle
+        idle_connections = len(manager.connections)
+        second = await _speak(manager, "dos ")
+        return first, idle_connections, second
+
+    fake, manager, (first, idle_connections, second) = _run(exercise, monkeypatch, ttl=0.05)
+
+    assert idle_connections == 0
+    assert first == (b"uno ", True)
+    assert second == (b"dos ", True)
+    assert fake.connections == 2
+    assert manager.stats()["connects"] == 2
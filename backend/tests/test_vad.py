@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from vad import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+
+def _fixture(pattern, seed=0):
+    """Speech-like bursts and pauses over low background noise; pattern is
+    (seconds, is_speech) pairs."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for seconds, is_speech in pattern:
+        size = int(seconds * SAMPLE_RATE)
+        noise = rng.normal(0, 0.002, size)
+        if is_speech:
+            t = np.arange(size) / SAMPLE_RATE
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+            noise += 0.2 * envelope * np.sin(2 * np.pi * 220 * t)
+        parts.append(noise.astype(np.float32))
+    return np.concatenate(parts)
+
+
+def _run(vad, audio, chunk_ms):
+    chunk = SAMPLE_RATE * chunk_ms // 1000
+    starts = ends = 0
+    for position in range(0, audio.size, chunk):
+        segment = vad.process(audio[position : position + chunk])
+        starts += segment.speech_started
+        ends += segment.speech_ended
+    return starts, ends
+
+
+@pytest.mark.parametrize("chunk_ms", [20, 100, 256])
+def test_fixture_report_in_audio_time(chunk_ms):
+    audio = _fixture([(1.0, False), (1.5, True), (1.0, False), (2.0, True), (1.5, False)])
+    vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE, hangover_ms=400)
+
+    starts, ends = _run(vad, audio, chunk_ms)
+    stats = vad.stats()
+
+    assert (starts, ends) == (2, 2)
+    assert stats["utterances"] == 2
+    # Measured on the audio itself, so it doesn't depend on how fast the
+    # fixture is fed in: the hangover, give or take a frame
+    assert stats["avg_detection_latency_seconds"] == pytest.approx(0.4, abs=0.03)
+    # Most of the 3.5 s of silence never reaches the STT engine
+    assert stats["bandwidth_saved"] > 0.3
+    assert stats["seconds_out"] < stats["seconds_in"]
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+whisper_pool = pytest.importorskip("services.speech_to_text.whisper_pool")
+
+MAX_LOOP_LAG = 0.05
+# Real model for the stream benchmark, e.g. "tiny"; the stand-in otherwise
+BENCHMARK_MODEL = os.getenv("WHISPER_BENCHMARK_MODEL", "")
+BENCHMARK_WINDOWS = 3
+
+
+def _busy(seconds):
+    # Matrix work, which like CTranslate2 runs with the GIL released
+    started = time.perf_counter()
+    matrix = np.random.default_rng(0).random((600, 600), dtype=np.float32)
+    while time.perf_counter() - started < seconds:
+        matrix = np.tanh(matrix @ matrix)
+
+
+def _segments(clip_timestamps):
+    segments = []
+    for clip in clip_timestamps:
+        start = clip["start"] / whisper_pool.WHISPER_SAMPLE_RATE
+        word = SimpleNamespace(start=start + 0.1, end=start + 0.4, word=" hello")
+        segments.append(SimpleNamespace(words=[word]))
+    return iter(segments), None
+
+
+class BusyPipeline:
+    """Stands in for the batched pipeline: a few hundred ms of work per call."""
+
+    def __init__(self):
+        self.calls = 0
+        self.busy_seconds = 0.0
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        started = time.perf_counter()
+        _busy(0.3)
+        self.calls += 1
+        self.busy_seconds += time.perf_counter() - started
+        return _segments(clip_timestamps)
+
+
+class BatchCostPipeline:
+    """Stand-in costing a fixed part per call plus a part per clip, the shape
+    of a batched decode: the encoder and per-call overhead are shared."""
+
+    def __init__(self, per_call=0.02, per_clip=0.005):
+        self.per_call = per_call
+        self.per_clip = per_clip
+        self.calls = 0
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        _busy(self.per_call + self.per_clip * len(clip_timestamps))
+        self.calls += 1
+        return _segments(clip_timestamps)
+
+
+def test_event_loop_stays_responsive_while_decoding(monkeypatch):
+    pipeline = BusyPipeline()
+    monkeypatch.setattr(whisper_pool, "_get_pipeline", lambda model_key: pipeline)
+    scheduler = whisper_pool.InferenceScheduler(("test",), pool="thread", workers=1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        lags = []
+        decoding = True
+
+        async def monitor():
+            while decoding:
+                expected = loop.time() + 0.01
+                await asyncio.sleep(0.01)
+                lags.append(loop.time() - expected)
+
+        async def session(session_id):
+            window = np.zeros(16000, dtype=np.float32)
+            results = []
+            for _ in range(3):
+                results.append(await scheduler.transcribe(session_id, window, "en"))
+            return results
+
+        watcher = asyncio.create_task(monitor())
+        results = await asyncio.gather(*(session(f"s{i}") for i in range(4)))
+        decoding = False
+        await watcher
+        return results, lags
+
+    try:
+        results, lags = asyncio.run(main())
+    finally:
+        scheduler.shutdown()
+
+    assert pipeline.busy_seconds > 0.5
+    assert max(lags) < MAX_LOOP_LAG
+    # Concurrent sessions share model calls, and each gets its own words back
+    assert pipeline.calls < 12
+    for session_results in results:
+        for words in session_results:
+            assert [word.word for word in words] == [" hello"]
+            assert words[0].start == pytest.approx(0.1)
+
+
+def test_prompted_requests_run_as_separate_batches(monkeypatch):
+    pipeline = BusyPipeline()
+    prompts = []
+    transcribe = pipeline.transcribe
+
+    def record(audio, clip_timestamps, initial_prompt=None, **kwargs):
+        prompts.append((initial_prompt, len(clip_timestamps)))
+        return transcribe(audio, clip_timestamps, **kwargs)
+
+    pipeline.transcribe = record
+    monkeypatch.setattr(whisper_pool, "_get_pipeline", lambda model_key: pipeline)
+    scheduler = whisper_pool.InferenceScheduler(("test",), pool="thread", workers=1)
+
+    async def main():
+        window = np.zeros(16000, dtype=np.float32)
+        return await asyncio.gather(
+            scheduler.transcribe("a", window, "en"),
+            scheduler.transcribe("b", window, "en", prompt="earlier text"),
+            scheduler.transcribe("c", window, "en"),
+        )
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        scheduler.shutdown()
+
+    # Unprompted sessions share one call; the prompted one gets its own,
+    # each in its own pool slot rather than queued behind the other
+    assert sorted(prompts, key=str) == [("earlier text", 1), (None, 2)]
+    assert all(len(words) == 1 for words in results)
+
+
+def test_pool_threads_share_the_model_but_not_the_pipeline(monkeypatch):
+    model = object()
+    monkeypatch.setattr(whisper_pool, "get_model", lambda *key: model)
+    monkeypatch.setattr(whisper_pool, "BatchedInferencePipeline", SimpleNamespace)
+    scheduler = whisper_pool.InferenceScheduler(("test",), pool="thread", workers=2)
+    barrier = threading.Barrier(2)
+
+    def pipelines():
+        # Hold both threads so each task lands on a different one
+        barrier.wait()
+        return whisper_pool._get_pipeline(("test",)), whisper_pool._get_pipeline(("test",))
+
+    try:
+        futures = [scheduler._executor.submit(pipelines) for _ in range(2)]
+        first, second = [future.result(timeout=5) for future in futures]
+    finally:
+        scheduler.shutdown()
+
+    assert first[0] is first[1] and second[0] is second[1]
+    assert first[0] is not second[0]
+    assert first[0].model is second[0].model is model
+
+
+def _run_streams(scheduler, streams):
+    async def stream(session_id):
+        window = np.random.default_rng(0).normal(0, 0.01, 16000).astype(np.float32)
+        for _ in range(BENCHMARK_WINDOWS):
+            await scheduler.transcribe(session_id, window, "en")
+
+    async def main():
+        await asyncio.gather(*(stream(f"s{index}") for index in range(streams)))
+
+    started = time.process_time()
+    asyncio.run(main())
+    return time.process_time() - started
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("streams", [1, 8, 32])
+def test_cpu_per_stream_with_and_without_batching(monkeypatch, report, streams):
+    if BENCHMARK_MODEL:
+        model_key = (BENCHMARK_MODEL, "int8", "cpu")
+    else:
+        model_key = ("stand-in",)
+        pipeline = BatchCostPipeline()
+        monkeypatch.setattr(whisper_pool, "_get_pipeline", lambda model_key: pipeline)
+
+    figures = {}
+    for name, max_batch in (("batched", whisper_pool.WHISPER_MAX_BATCH), ("unbatched", 1)):
+        scheduler = whisper_pool.InferenceScheduler(
+            model_key, max_batch=max_batch, pool="thread", workers=1
+        )
+        try:
+            cpu_seconds = _run_streams(scheduler, streams)
+        finally:
+            scheduler.shutdown()
+        snapshots = [stats.snapshot() for stats in scheduler.stats.values()]
+        figures[f"{name}_cpu_per_audio_second"] = cpu_seconds / (streams * BENCHMARK_WINDOWS)
+        figures[f"{name}_queue_latency_ms"] = (
+            statistics.median(s["avg_queue_latency_seconds"] for s in snapshots) * 1000
+        )
+        figures[f"{name}_real_time_factor"] = statistics.median(
+            s["avg_real_time_factor"] for s in snapshots
+        )
+
+    report(model=BENCHMARK_MODEL or "stand-in", streams=streams, **figures)
+    if streams > 1:
+        # Concurrent streams share the per-call cost
+        assert figures["batched_cpu_per_audio_second"] < figures["unbatched_cpu_per_audio_second"]
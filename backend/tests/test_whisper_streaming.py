@@ -0,0 +1,243 @@
+"""WER and latency of the streaming Whisper engine over a folder of WAV fixtures.
+
+Each fixture is name.wav (mono PCM) with its reference transcript in
+name.txt. Point WHISPER_FIXTURES_DIR at recordings and set
+WHISPER_BENCHMARK_MODEL (e.g. "tiny") to measure a real model. Without
+them, synthetic fixtures are decoded by a stand-in that recognises tone
+bursts as words and garbles any word cut off by the end of a window, as
+Whisper does, which is enough to compare window policies.
+"""
+
+import asyncio
+import os
+import statistics
+import wave
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+whisper_pool = pytest.importorskip("services.speech_to_text.whisper_pool")
+from audio_format import Resampler  # noqa: E402
+from audio_processor import AudioProcessor  # noqa: E402
+from services.speech_to_text.faster_whisper_client import (  # noqa: E402
+    FasterWhisperClient,
+    _normalize,
+)
+
+FIXTURES_DIR = os.getenv("WHISPER_FIXTURES_DIR", "")
+BENCHMARK_MODEL = os.getenv("WHISPER_BENCHMARK_MODEL", "")
+SAMPLE_RATE = whisper_pool.WHISPER_SAMPLE_RATE
+
+STEP_SECONDS = [0.5, 1.0, 2.0]
+POLICIES = ["agreement", "holdback"]
+
+# Stand-in vocabulary: word i is a burst at 300 + 60 * i Hz
+VOCABULARY = (
+    "the quick brown fox jumps over lazy dog while seven bright stars "
+    "watch calm rivers flow past old stone bridges"
+).split()
+SENTENCES = [
+    "the quick brown fox jumps over the lazy dog",
+    "seven bright stars watch calm rivers flow past old stone bridges",
+    "the dog jumps while the fox watch old stars",
+]
+
+
+def _tone_frequency(index: int) -> float:
+    return 300.0 + 60.0 * index
+
+
+def _write_wav(path: Path, samples: np.ndarray):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+
+
+def _synthetic_fixtures(directory: Path):
+    rng = np.random.default_rng(0)
+    for number, sentence in enumerate(SENTENCES):
+        parts = [np.zeros(int(0.5 * SAMPLE_RATE), dtype=np.float32)]
+        for word in sentence.split():
+            duration = rng.uniform(0.25, 0.45)
+            t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+            tone = 0.3 * np.sin(2 * np.pi * _tone_frequency(VOCABULARY.index(word)) * t)
+            gap = np.zeros(int(rng.uniform(0.1, 0.25) * SAMPLE_RATE))
+            parts += [tone.astype(np.float32), gap.astype(np.float32)]
+        parts.append(np.zeros(int(0.5 * SAMPLE_RATE), dtype=np.float32))
+        _write_wav(directory / f"synthetic-{number}.wav", np.concatenate(parts))
+        (directory / f"synthetic-{number}.txt").write_text(sentence)
+
+
+def _read_wav(path: Path) -> np.ndarray:
+    with wave.open(str(path), "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        frames = f.readframes(f.getnframes())
+    assert width == 2, f"{path}: only 16-bit PCM fixtures are supported"
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    samples = samples.reshape(-1, channels).mean(axis=1).astype(np.float32)
+    if rate != SAMPLE_RATE:
+        samples = Resampler(rate, SAMPLE_RATE).process(samples)
+    return samples
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance over the reference length."""
+    ref = [_normalize(w) for w in reference.split() if _normalize(w)]
+    hyp = [_normalize(w) for w in hypothesis.split() if _normalize(w)]
+    distances = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, distances[j] = distances[j], min(
+                distances[j] + 1,
+                distances[j - 1] + 1,
+                previous + (ref_word != hyp_word),
+            )
+    return distances[-1] / max(len(ref), 1)
+
+
+class ToneWordPipeline:
+    """Recognises each tone burst in a clip as its vocabulary word; a burst
+    running into the end of the clip comes out truncated."""
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        segments = []
+        for clip in clip_timestamps:
+            samples = audio[clip["start"] : clip["end"]]
+            offset = clip["start"] / SAMPLE_RATE
+            segments.append(SimpleNamespace(words=self._words(samples, offset)))
+        return iter(segments), None
+
+    def _words(self, samples, offset):
+        frame = SAMPLE_RATE // 100
+        count = samples.size // frame
+        if not count:
+            return []
+        energy = np.sqrt(np.mean(samples[: count * frame].reshape(count, frame) ** 2, axis=1))
+        voiced = np.concatenate(([False], energy > 0.05, [False]))
+        edges = np.flatnonzero(np.diff(voiced.astype(np.int8)))
+        words = []
+        for start, end in zip(edges[::2], edges[1::2]):
+            burst = samples[start * frame : end * frame]
+            if burst.size < frame * 5:
+                continue
+            spectrum = np.abs(np.fft.rfft(burst))
+            frequency = np.argmax(spectrum) * SAMPLE_RATE / burst.size
+            index = int(round((frequency - 300.0) / 60.0))
+            word = VOCABULARY[min(max(index, 0), len(VOCABULARY) - 1)]
+            if end == count:
+                # Cut off mid-word: the hypothesis is unstable
+                word = word[: max(1, len(word) // 2)]
+            words.append(
+                SimpleNamespace(
+                    start=offset + start * frame / SAMPLE_RATE,
+                    end=offset + end * frame / SAMPLE_RATE,
+                    word=" " + word,
+                )
+            )
+        return words
+
+
+class MeasuredClient(FasterWhisperClient):
+    """Records how much audio had been read when each word was committed."""
+
+    def __init__(self, processor, **kwargs):
+        super().__init__(**kwargs)
+        self.processor = processor
+        self.decodes = 0
+        self.lags = []
+
+    def _position(self) -> float:
+        read = self.processor.total_written - self.processor.available
+        return read / 4 / self.sample_rate
+
+    async def _decode(self, window):
+        self.decodes += 1
+        return await super()._decode(window)
+
+    def _commit(self, words):
+        position = self._position()
+        self.lags += [position - word.end for word in words]
+        super()._commit(words)
+
+
+def _transcribe_all(fixtures, **options):
+    """Stream every fixture through its own client; one event loop, since
+    the shared scheduler is bound to the loop it first ran on."""
+
+    async def transcribe(samples):
+        processor = AudioProcessor(capacity=samples.size * 4 + 1)
+        transcripts = []
+        client = MeasuredClient(
+            processor,
+            on_transcript=transcripts.append,
+            model_size=BENCHMARK_MODEL or "stand-in",
+            **options,
+        )
+        processor.write_audio(samples)
+        processor.close()
+        await client.transcribe_audio_stream(processor)
+        return " ".join(transcripts), client
+
+    async def main():
+        return [await transcribe(samples) for samples, _ in fixtures]
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="module")
+def fixtures(tmp_path_factory):
+    directory = Path(FIXTURES_DIR) if FIXTURES_DIR else tmp_path_factory.mktemp("wav")
+    if not FIXTURES_DIR:
+        _synthetic_fixtures(directory)
+    loaded = [
+        (_read_wav(wav), wav.with_suffix(".txt").read_text().strip())
+        for wav in sorted(directory.glob("*.wav"))
+    ]
+    assert loaded, f"No WAV fixtures in {directory}"
+    return loaded
+
+
+@pytest.fixture(autouse=True)
+def stand_in_model(monkeypatch):
+    if not BENCHMARK_MODEL:
+        pipeline = ToneWordPipeline()
+        monkeypatch.setattr(whisper_pool, "_get_pipeline", lambda model_key: pipeline)
+    yield
+    for scheduler in whisper_pool._schedulers.values():
+        scheduler.shutdown()
+    whisper_pool._schedulers.clear()
+
+
+def test_word_error_rate():
+    assert word_error_rate("the quick brown fox", "The quick, brown fox.") == 0
+    assert word_error_rate("the quick brown fox", "the brown fox fox") == 0.5
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("policy", POLICIES)
+@pytest.mark.parametrize("step_seconds", STEP_SECONDS)
+def test_streaming_wer_and_latency(fixtures, report, policy, step_seconds):
+    errors, lags, decodes, audio_seconds = [], [], 0, 0.0
+    results = _transcribe_all(fixtures, step_seconds=step_seconds, commit_policy=policy)
+    for (samples, reference), (hypothesis, client) in zip(fixtures, results):
+        errors.append(word_error_rate(reference, hypothesis))
+        lags += client.lags
+        decodes += client.decodes
+        audio_seconds += samples.size / SAMPLE_RATE
+
+    report(
+        fixtures=len(fixtures),
+        wer=statistics.mean(errors),
+        commit_lag_p50_seconds=statistics.median(lags),
+        commit_lag_max_seconds=max(lags),
+        decodes_per_audio_second=decodes / audio_seconds,
+    )
+    if not BENCHMARK_MODEL:
+        # Words cut by a window edge are never committed half-heard
+        assert statistics.mean(errors) < 0.1
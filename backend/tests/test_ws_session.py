@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from starlette.testclient import TestClient
+
+import main
+from audio_processor import AUDIO_FRAME_HEADER, FRAME_FLAG_TERMINAL
+from services.speech_to_text.engine import STTEngine
+from shared_state import ongoing_calls
+from tracing import UtteranceTrace
+
+
+class FailingEngine(STTEngine):
+    """Every stream fails at once, as with a bad API key."""
+
+    starts = 0
+
+    async def transcribe_audio_stream(self, audio_processor):
+        FailingEngine.starts += 1
+        raise RuntimeError("invalid API key")
+
+
+class EchoEngine(STTEngine):
+    """Transcribes each chunk as `transcript` as soon as it is read."""
+
+    utterance_padding = 0.0
+    transcript = "hello"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.read_bytes = 0
+
+    async def transcribe_audio_stream(self, audio_processor):
+        while chunk := await audio_processor.read_some(1 << 16):
+            self.read_bytes += len(chunk)
+            self.on_transcript(self.transcript)
+            self._mark_transcribed(self.read_bytes / (16000 * 4))
+
+
+def test_translation_does_not_hold_up_the_next_utterance(monkeypatch):
+    engine = None
+
+    def create_engine(**kwargs):
+        nonlocal engine
+        kwargs.pop("engine")
+        engine = EchoEngine(**kwargs)
+        return engine
+
+    read_after_translation = []
+
+    async def slow_translation(*args, **kwargs):
+        await asyncio.sleep(1)
+        read_after_translation.append(engine.read_bytes)
+
+    monkeypatch.setattr(main, "create_stt_engine", create_engine)
+    monkeypatch.setattr(main, "translate_text_stream", slow_translation)
+    ongoing_calls.accept("1", "2")
+    ongoing_calls.update_participant("2", language_code="es")
+    samples = np.full(1600, 0.1, dtype=np.float32).tobytes()
+
+    try:
+        with TestClient(main.app).websocket_connect("/ws?user_id=1&vad=0") as websocket:
+            for sequence in range(5):
+                websocket.send_bytes(AUDIO_FRAME_HEADER.pack(0, sequence) + samples)
+            websocket.send_bytes(AUDIO_FRAME_HEADER.pack(FRAME_FLAG_TERMINAL, 5))
+            # The next utterance starts while the first is being translated
+            for sequence in range(6, 11):
+                time.sleep(0.02)
+                websocket.send_bytes(AUDIO_FRAME_HEADER.pack(0, sequence) + samples)
+            deadline = time.monotonic() + 3
+            while not read_after_translation and time.monotonic() < deadline:
+                time.sleep(0.01)
+    finally:
+        ongoing_calls.end("1")
+
+    assert read_after_translation == [10 * len(samples)]
+
+
+def test_failing_transcription_backs_off_then_closes_the_session(monkeypatch):
+    monkeypatch.setattr(main, "create_stt_engine", lambda **kwargs: FailingEngine())
+    monkeypatch.setattr(main, "STT_RECONNECT_DELAY", 0.01)
+    samples = np.full(1600, 0.1, dtype=np.float32).tobytes()
+
+    with TestClient(main.app).websocket_connect("/ws?user_id=1") as websocket:
+        deadline = time.monotonic() + 2
+        sequence = 0
+        while time.monotonic() < deadline:
+            websocket.send_bytes(AUDIO_FRAME_HEADER.pack(0, sequence) + samples)
+            sequence += 1
+            time.sleep(0.005)
+        closed = websocket.receive()
+
+    assert closed["type"] == "websocket.close"
+    assert closed["code"] == 1011
+    # One stream per attempt, not one per microphone frame
+    assert FailingEngine.starts == main.STT_MAX_RECONNECTS
+    assert sequence > 10 * FailingEngine.starts
+    assert not main.ws_sessions
+
+
+def test_failed_engine_creation_leaves_no_session_behind():
+    client = TestClient(main.app)
+    for _ in range(3):
+        with client.websocket_connect("/ws?user_id=1&stt_engine=nope") as websocket:
+            closed = websocket.receive()
+        assert closed["type"] == "websocket.close"
+        assert closed["code"] == 4000
+
+    assert not main.ws_sessions
+    assert client.get("/ready").status_code == 200
+    assert "ws_sessions_active 0.0" in client.get("/metrics").text.splitlines()
+
+
+@pytest.mark.parametrize("transcript", ["", "hello"])
+def test_only_non_empty_transcripts_mark_the_trace(monkeypatch, transcript):
+    traces = []
+
+    class RecordingTrace(UtteranceTrace):
+        def __init__(self, *args):
+            super().__init__(*args)
+            traces.append(self)
+
+    monkeypatch.setattr(EchoEngine, "transcript", transcript)
+    monkeypatch.setattr(main, "create_stt_engine", lambda engine, **kwargs: EchoEngine(**kwargs))
+    monkeypatch.setattr(main, "UtteranceTrace", RecordingTrace)
+    samples = np.full(1600, 0.1, dtype=np.float32).tobytes()
+
+    with TestClient(main.app).websocket_connect("/ws?user_id=1&vad=0") as websocket:
+        for sequence in range(3):
+            websocket.send_bytes(AUDIO_FRAME_HEADER.pack(0, sequence) + samples)
+        websocket.send_bytes(AUDIO_FRAME_HEADER.pack(FRAME_FLAG_TERMINAL, 3))
+        deadline = time.monotonic() + 2
+        while not (traces and traces[0].finished) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    (trace,) = traces
+    if transcript:
+        assert {"first_transcript", "final_transcript"} <= trace.marks.keys()
+        assert trace.finished
+    else:
+        # Silence-only finals neither mark the stages nor get recorded
+        assert "first_transcript" not in trace.marks
+        assert not trace.finished
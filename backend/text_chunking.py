@@ -0,0 +1,123 @@
+import asyncio
+import os
+import unicodedata
+
+# When a chunk may go to TTS: at the end of a "sentence", a "clause" or
+# any "word"; no earlier than TTS_MIN_CHARS characters (wide CJK
+# characters count double), and after at most TTS_MAX_WAIT_MS of holding
+# text back, at the last word boundary (0 disables the timer)
+TTS_FLUSH_ON = os.getenv("TTS_FLUSH_ON", "clause")
+TTS_MIN_CHARS = int(os.getenv("TTS_MIN_CHARS", "12"))
+TTS_MAX_WAIT_MS = int(os.getenv("TTS_MAX_WAIT_MS", "250"))
+
+SENTENCE_ENDINGS = ".!?…。！？"
+CLAUSE_ENDINGS = SENTENCE_ENDINGS + ",;:)]}—、，；：）」』"
+
+
+def _is_wide(char: str) -> bool:
+    # CJK text has no spaces; any position after a wide character is a word break
+    return unicodedata.east_asian_width(char) in ("W", "F")
+
+
+def _boundary_split(buffer: str, flush_on: str, min_chars: int) -> int:
+    """Index just past the last flushable boundary in buffer, or 0 if there is none."""
+    endings = SENTENCE_ENDINGS if flush_on == "sentence" else CLAUSE_ENDINGS
+    split = 0
+    weight = 0
+    for index, char in enumerate(buffer):
+        weight += 2 if _is_wide(char) else 1
+        if flush_on == "word":
+            boundary = char.isspace() or _is_wide(char)
+        elif _is_wide(char):
+            # Full-width punctuation needs no following space
+            boundary = char in endings
+        else:
+            # ASCII punctuation only counts once followed by a space, so
+            # "3.5" or "e.g." mid-stream isn't mistaken for a boundary
+            boundary = (
+                char in endings
+                and index + 1 < len(buffer)
+                and buffer[index + 1].isspace()
+            )
+        if boundary and weight >= min_chars:
+            split = index + 1
+    return split
+
+
+def _word_split(buffer: str) -> int:
+    """Index just past the last word break in buffer, or 0 if there is none.
+
+    Thai and similar scripts only break at spaces, so their words are
+    never cut even when the timer fires.
+    """
+    for index in range(len(buffer) - 1, -1, -1):
+        if buffer[index].isspace() or _is_wide(buffer[index]):
+            return index + 1
+    return 0
+
+
+def _through_space(buffer: str, split: int) -> int:
+    # Whitespace after a boundary stays with the chunk before it
+    while split and split < len(buffer) and buffer[split].isspace():
+        split += 1
+    return split
+
+
+def _chunk(text: str) -> str:
+    # ElevenLabs expects chunks to end with a space. Text keeps its own
+    # whitespace, and none is added after CJK, which has no spaces to add
+    if text[-1].isspace() or _is_wide(text[-1]):
+        return text
+    return text + " "
+
+
+async def text_chunker(
+    chunks,
+    flush_on: str = TTS_FLUSH_ON,
+    min_chars: int = TTS_MIN_CHARS,
+    max_wait_ms: int = TTS_MAX_WAIT_MS,
+):
+    """Regroup streamed LLM tokens into TTS-friendly chunks without reordering or dropping text."""
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer = ""
+    held_since = None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None
+            if buffer.strip() and max_wait_ms:
+                timeout = max(0.0, held_since + max_wait_ms / 1000 - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if done:
+                try:
+                    text = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    break
+                pending = None
+                if not buffer.strip():
+                    held_since = loop.time()
+                buffer += text
+                split = _boundary_split(buffer, flush_on, min_chars)
+            else:
+                split = _word_split(buffer)
+                if not split:
+                    # Nothing can be cut yet; wait another period
+                    held_since = loop.time()
+
+            split = _through_space(buffer, split)
+            if split:
+                head, buffer = buffer[:split], buffer[split:]
+                if head.strip():
+                    yield _chunk(head)
+                held_since = loop.time()
+
+        if buffer.strip():
+            yield _chunk(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
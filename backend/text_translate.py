@@ -1,30 +1,20 @@
 from websocket import broadcast_audio_stream, start_websocket_server
-from openai import OpenAI
-from openai import AsyncOpenAI
+from shared_state import http_clients, tts_sessions
+from tracing import log
+from metrics import upstream_latency
+from translation_cache import translation_cache
+from text_chunking import text_chunker
+from tts_sessions import TTS_MODEL_ID, VOICE_SETTINGS
+from audio_cache import AudioRecording, audio_cache, audio_cache_key, replay
 import asyncio
-import websockets
-import json
-import base64
+import time
 import subprocess
 import shutil
-import os
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = OpenAI(
-    organization="org-wTKqrfyGm4y0SrDgy5jzh9SH",
-    project="proj_TKDNPdEkva9jDdK19AGEN8w8",
-)
-
-completion = client.chat.completions.create(
-    model="gpt-3.5-turbo",
-    messages=[
-        {"role": "user", "content": "", "response_format": {"type": "json_object"}}
-    ],
-)
-
 
 def translation_prompt(original_text: str, source_language: str, target_language: str):
     return f"Translate the following text from language code: {source_language} to language code: {target_language}: {original_text}"
@@ -33,36 +23,28 @@ def translation_prompt(original_text: str, source_language: str, target_language
 def translate_text(
     original_text: str, source_language: str, target_language: str
 ) -> str:
+    cached = translation_cache.get_blocking(original_text, source_language, target_language)
+    if cached is not None:
+        return cached
+
     prompt = translation_prompt(original_text, source_language, target_language)
     try:
-        completion = client.chat.completions.create(
+        started = time.perf_counter()
+        completion = http_clients.openai_sync.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
         )
-        return completion.choices[0].message.content
+        translation = completion.choices[0].message.content
+        elapsed = time.perf_counter() - started
+        upstream_latency.observe(elapsed, "openai", "completion")
+        translation_cache.put(
+            original_text, source_language, target_language, translation, elapsed=elapsed
+        )
+        return translation
     except Exception as e:
         raise Exception(f"Translation failed: {str(e)}")
 
 
-async def text_chunker(chunks):
-    """Split text into chunks, ensuring to not break sentences."""
-    splitters = (".", ",", "?", "!", ";", ":", "—", "-", "(", ")", "[", "]", "}", " ")
-    buffer = ""
-
-    async for text in chunks:
-        if buffer.endswith(splitters):
-            yield buffer + " "
-            buffer = text
-        elif text.startswith(splitters):
-            yield buffer + text[0] + " "
-            buffer = text[1:]
-        else:
-            buffer += text
-
-    if buffer:
-        yield buffer + " "
-
-
 def is_installed(lib_name):
     return shutil.which(lib_name) is not None
 
@@ -93,49 +75,86 @@ async def stream(audio_stream):
 
 
 async def text_to_speech_input_streaming(
-    voice_id, text_iterator, broadcast=False, recipient_id=None
+    voice_id,
+    text_iterator,
+    broadcast=False,
+    recipient_id=None,
+    on_first_audio=None,
+    text=None,
+    trace=None,
 ):
-    """Send text to ElevenLabs API and stream the returned audio."""
-    uri = f"wss://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream-input?model_id=eleven_flash_v2_5"
-
-    async with websockets.connect(uri) as websocket:
-        await websocket.send(
-            json.dumps(
-                {
-                    "text": " ",
-                    "voice_settings": {"stability": 0.5, "similarity_boost": 0.8},
-                    "xi_api_key": os.getenv("ELEVENLABS_API_KEY"),
-                }
-            )
-        )
+    """Send text to ElevenLabs API and stream the returned audio.
+
+    Runs as one context on the pooled connection for voice_id, so only the
+    first utterance for a voice waits for the handshake. When the full
+    text is known up front and its audio is cached, the cached chunks are
+    replayed instead. Completed syntheses are added to the audio cache.
+    """
+
+    def first_audio():
+        if trace is not None:
+            trace.mark("tts_first_audio")
+        if on_first_audio:
+            on_first_audio()
 
-        async def listen():
-            while True:
-                try:
-                    message = await websocket.recv()
-                    data = json.loads(message)
-                    if data.get("audio"):
-                        yield base64.b64decode(data["audio"])
-                    elif data.get("isFinal"):
-                        break
-                except websockets.exceptions.ConnectionClosed:
-                    print("Connection closed")
-                    break
+    def first_delivered():
+        if trace is not None:
+            trace.mark("first_byte_delivered")
 
+    def play(audio_stream):
         if broadcast:
-            listen_task = asyncio.create_task(
-                broadcast_audio_stream(listen(), recipient_id=recipient_id)
+            return asyncio.create_task(
+                broadcast_audio_stream(
+                    audio_stream,
+                    recipient_id=recipient_id,
+                    on_first_chunk=first_audio,
+                    on_first_delivered=first_delivered,
+                )
             )
-        else:
-            listen_task = asyncio.create_task(stream(listen()))
+        return asyncio.create_task(stream(audio_stream))
+
+    if text is not None:
+        chunks = await audio_cache.load(
+            audio_cache_key(voice_id, TTS_MODEL_ID, VOICE_SETTINGS, text)
+        )
+        if chunks is not None:
+            await play(replay(chunks))
+            return
+
+    recording = AudioRecording()
+
+    async def recorded(audio_stream):
+        async for chunk in audio_stream:
+            recording.add(chunk)
+            yield chunk
+
+    # The text exactly as it came in, before chunking, so the cache key
+    # matches the lookup of a cached translation above
+    spoken = []
+
+    async def collected(text_chunks):
+        async for text_chunk in text_chunks:
+            spoken.append(text_chunk)
+            yield text_chunk
+
+    async with tts_sessions.context(voice_id) as context:
+        listen_task = play(recorded(context.audio()))
 
-        async for text in text_chunker(text_iterator):
-            print(f"Sending to websocket: {text}")
-            await websocket.send(json.dumps({"text": text}))
+        try:
+            async for text_chunk in text_chunker(collected(text_iterator)):
+                await context.send(text_chunk)
 
-        await websocket.send(json.dumps({"end_of_stream": True}))
+            await context.end()
+            await listen_task
+        finally:
+            listen_task.cancel()
 
-        await listen_task
+    if context.completed:
+        key = audio_cache_key(voice_id, TTS_MODEL_ID, VOICE_SETTINGS, "".join(spoken))
+        try:
+            await audio_cache.save(key, recording)
+        except OSError as e:
+            print(f"Error caching synthesized audio: {e}")
 
 
 async def translate_text_stream(
@@ -145,31 +164,67 @@ async def translate_text_stream(
     broadcast=False,
     voice_id="xeg56Dz2Il4WegdaPo82",
     recipient_id=None,
+    on_first_audio=None,
+    trace=None,
 ):
     """Streaming version of translate_text that works with ElevenLabs"""
-    print(
-        f"[translate_text_stream] Translating from language code: {source_language} to language code: {target_language}: {original_text} to send to recipient: {recipient_id}"
+    log.debug(
+        "[translate_text_stream] Translating from language code: %s to language code: %s: %s to send to recipient: %s",
+        source_language,
+        target_language,
+        original_text,
+        recipient_id,
     )
     prompt = translation_prompt(original_text, source_language, target_language)
-    aclient = AsyncOpenAI(
-        organization="org-wTKqrfyGm4y0SrDgy5jzh9SH",
-        project="proj_TKDNPdEkva9jDdK19AGEN8w8",
-    )
 
     try:
-        response = await aclient.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            stream=True,
-        )
+        cached = await translation_cache.get(original_text, source_language, target_language)
+        if cached is not None:
+            # Replay the stored translation straight into TTS, skipping the LLM
+            async def text_iterator():
+                yield cached
+
+        else:
+            started = time.perf_counter()
+            response = await http_clients.openai.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
 
-        async def text_iterator():
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            async def text_iterator():
+                pieces = []
+                async for chunk in response:
+                    if chunk.choices[0].delta.content:
+                        if not pieces:
+                            upstream_latency.observe(
+                                time.perf_counter() - started, "openai", "first_token"
+                            )
+                            if trace is not None:
+                                trace.mark("llm_first_token")
+                        pieces.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                if trace is not None:
+                    trace.mark("llm_last_token")
+                elapsed = time.perf_counter() - started
+                upstream_latency.observe(elapsed, "openai", "completion")
+                # Only complete translations are cached
+                translation_cache.put(
+                    original_text,
+                    source_language,
+                    target_language,
+                    "".join(pieces),
+                    elapsed=elapsed,
+                )
 
         await text_to_speech_input_streaming(
-            voice_id, text_iterator(), broadcast, recipient_id
+            voice_id,
+            text_iterator(),
+            broadcast,
+            recipient_id,
+            on_first_audio,
+            text=cached,
+            trace=trace,
         )
     except Exception as e:
         raise Exception(f"Translation failed: {str(e)}")
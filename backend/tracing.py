@@ -0,0 +1,143 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from collections import deque
+from typing import Dict, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Recent samples kept per stage for percentiles
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "1000"))
+
+# Pipeline stages in the order an utterance normally passes them
+STAGES = (
+    "audio_ingest",
+    "first_transcript",
+    "speech_end",
+    "final_transcript",
+    "llm_first_token",
+    "llm_last_token",
+    "tts_first_audio",
+    "first_byte_delivered",
+)
+
+# Records are handed to a listener thread, so logging from the event loop
+# never blocks on stdout
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler(sys.stdout)
+)
+_log_listener.start()
+log = logging.getLogger("pipeline")
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+log.setLevel(LOG_LEVEL)
+log.propagate = False
+
+
+class StageStats:
+    """Recent per-stage timings, in seconds from the start of the utterance."""
+
+    def __init__(self, history: int = TRACE_HISTORY):
+        self.history = history
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, stage: str, seconds: float):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.history)
+        samples.append(seconds)
+
+    def percentiles(self) -> dict:
+        result = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[stage] = {
+                "count": len(ordered),
+                "p50": ordered[int(0.50 * (len(ordered) - 1))],
+                "p95": ordered[int(0.95 * (len(ordered) - 1))],
+            }
+        return result
+
+
+stage_stats = StageStats()
+
+
+class UtteranceTrace:
+    """Timestamps of one utterance's trip from microphone to listener.
+
+    Stages are marked as they happen (only the first mark counts unless
+    told otherwise) and nothing is reported until finish(), which records
+    them in stage_stats and, when the OpenTelemetry API is installed,
+    emits an "utterance" span with one child span per stage.
+    """
+
+    def __init__(self, speaker_id: Optional[str], mode: str):
+        self.speaker_id = speaker_id
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.started_ns = time.time_ns()
+        self.marks: Dict[str, float] = {}
+        self.finished = False
+
+    def mark(self, stage: str, first_only: bool = True):
+        if first_only and stage in self.marks:
+            return
+        self.marks[stage] = time.perf_counter()
+
+    def _ns(self, at: float) -> int:
+        return self.started_ns + int((at - self.started) * 1e9)
+
+    def _export(self, ordered):
+        tracer = otel_trace.get_tracer("translation-pipeline")
+        root = tracer.start_span(
+            "utterance",
+            start_time=self.started_ns,
+            attributes={"speaker_id": str(self.speaker_id), "mode": self.mode},
+        )
+        context = otel_trace.set_span_in_context(root)
+        previous = self.started
+        for stage, at in ordered:
+            span = tracer.start_span(stage, context=context, start_time=self._ns(previous))
+            span.end(end_time=self._ns(at))
+            previous = at
+        root.end(end_time=self._ns(previous))
+
+    def finish(self):
+        if self.finished or not self.marks:
+            return
+        self.finished = True
+        ordered = sorted(self.marks.items(), key=lambda item: item[1])
+        for stage, at in ordered:
+            stage_stats.record(stage, at - self.started)
+        if "speech_end" in self.marks and "first_byte_delivered" in self.marks:
+            # Negative in incremental mode when audio starts before the
+            # speaker is done
+            latency = self.marks["first_byte_delivered"] - self.marks["speech_end"]
+            stage_stats.record("end_of_speech_to_first_byte", latency)
+            log.info(
+                "[latency] %s: end of speech to first audio byte %.0f ms",
+                self.mode,
+                latency * 1000,
+            )
+        if otel_trace is not None:
+            self._export(ordered)
+        log.debug(
+            json.dumps(
+                {
+                    "utterance": self.speaker_id,
+                    "mode": self.mode,
+                    "stages_ms": {
+                        stage: round((at - self.started) * 1000, 1)
+                        for stage, at in ordered
+                    },
+                }
+            )
+        )
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+# SQLite file for the persistent tier; empty keeps the cache in memory only
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "")
+
+
+def normalize_text(text: str) -> str:
+    """Cache key form of text: NFKC, case-folded, single-spaced."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class TranslationCache:
+    """LRU of finished translations keyed by (normalized text, source, target).
+
+    Common short turns ("yes", "can you hear me?") are translated once and
+    replayed afterwards without calling the LLM. With a path, entries are
+    also written to SQLite so they survive restarts and are shared by
+    workers on the same host; memory misses fall through to it. SQLite is
+    only ever touched from one background thread, so the event loop never
+    waits on a query or a WAL commit. The memory tier and counters are
+    shared with translate_text's worker threads and guarded by a lock.
+    """
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_SIZE, path: str = TRANSLATION_CACHE_PATH):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._executor = None
+        if path:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="translation-cache")
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    PRIMARY KEY (source, target, text)
+                )
+                """
+            )
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Seconds the LLM took on misses, to estimate what a hit saves
+        self._translate_seconds = 0.0
+        self._translations = 0
+
+    def _remember(self, key, translation):
+        # Called with the lock held
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _hit(self, key) -> Optional[str]:
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return translation
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _load(self, key) -> Optional[str]:
+        # Runs on the executor thread
+        row = self._db.execute(
+            "SELECT translation FROM translations WHERE source = ? AND target = ? AND text = ?",
+            (key[1], key[2], key[0]),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _store(self, key, translation):
+        # Runs on the executor thread
+        self._db.execute(
+            "INSERT OR REPLACE INTO translations (source, target, text, translation) VALUES (?, ?, ?, ?)",
+            (key[1], key[2], key[0], translation),
+        )
+
+    def _disk_hit(self, key, translation: Optional[str]) -> Optional[str]:
+        if translation is not None:
+            with self._lock:
+                self._remember(key, translation)
+                self.hits += 1
+                self.disk_hits += 1
+        return translation
+
+    async def get(self, text: str, source: str, target: str) -> Optional[str]:
+        key = (normalize_text(text), source, target)
+        translation = self._hit(key)
+        if translation is None and self._db is not None:
+            loop = asyncio.get_running_loop()
+            row = await loop.run_in_executor(self._executor, self._load, key)
+            translation = self._disk_hit(key, row)
+        if translation is None:
+            self._miss()
+        return translation
+
+    def get_blocking(self, text: str, source: str, target: str) -> Optional[str]:
+        """get() for code running outside the event loop."""
+        key = (normalize_text(text), source, target)
+        translation = self._hit(key)
+        if translation is None and self._db is not None:
+            translation = self._disk_hit(key, self._executor.submit(self._load, key).result())
+        if translation is None:
+            self._miss()
+        return translation
+
+    def put(self, text: str, source: str, target: str, translation: str, elapsed: float = 0.0):
+        """Store a finished translation; elapsed is how long the LLM took for it.
+
+        Never blocks: the SQLite write is queued behind any earlier ones.
+        """
+        key = (normalize_text(text), source, target)
+        with self._lock:
+            self._remember(key, translation)
+            if elapsed:
+                self._translate_seconds += elapsed
+                self._translations += 1
+        if self._db is not None:
+            self._executor.submit(self._store, key, translation)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, hits, disk_hits, misses = (
+                len(self._entries),
+                self.hits,
+                self.disk_hits,
+                self.misses,
+            )
+            average = self._translate_seconds / self._translations if self._translations else 0.0
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "hits": hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "avg_translate_seconds": average,
+            "latency_saved_seconds": hits * average,
+        }
+
+    def close(self):
+        """Finish queued writes and close the SQLite tier."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._db.close()
+            self._executor = self._db = None
+
+
+translation_cache = TranslationCache()
@@ -0,0 +1,221 @@
+import asyncio
+import base64
+import json
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import websockets
+
+from metrics import upstream_latency
+
+ELEVENLABS_WS_URL = os.getenv("ELEVENLABS_WS_URL", "wss://api.elevenlabs.io")
+TTS_MODEL_ID = os.getenv("TTS_MODEL_ID", "eleven_flash_v2_5")
+# Idle connections are closed after this many seconds
+TTS_CONNECTION_TTL = float(os.getenv("TTS_CONNECTION_TTL", "120"))
+VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.8}
+
+
+class TTSContext:
+    """One utterance on a shared connection, identified by its context_id."""
+
+    def __init__(self, connection: "TTSConnection", context_id: str):
+        self.connection = connection
+        self.context_id = context_id
+        # Set once ElevenLabs has sent everything for this context
+        self.completed = False
+        self.opened = time.perf_counter()
+        self.first_audio = None
+        self._audio = asyncio.Queue()
+
+    async def send(self, text: str):
+        await self.connection.send({"text": text, "context_id": self.context_id})
+
+    async def end(self):
+        """Flush any buffered text; the audio stream ends once it's spoken."""
+        await self.connection.send({"context_id": self.context_id, "flush": True})
+        await self.connection.send({"context_id": self.context_id, "close_context": True})
+
+    async def audio(self):
+        """Yield this context's audio chunks until ElevenLabs marks it final."""
+        while True:
+            chunk = await self._audio.get()
+            if chunk is None:
+                return
+            yield chunk
+
+
+class TTSConnection:
+    """A multi-context stream-input socket for one (voice_id, model_id).
+
+    Utterances run as separate contexts over the same socket, so only the
+    first one pays for the TLS handshake and voice warm-up. A reader task
+    routes incoming audio to its context by contextId.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.contexts: Dict[str, TTSContext] = {}
+        self.last_used = time.monotonic()
+        self._reader = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(cls, voice_id: str, model_id: str, api_key: Optional[str]):
+        uri = (
+            f"{ELEVENLABS_WS_URL}/v1/text-to-speech/{voice_id}/multi-stream-input"
+            f"?model_id={model_id}&inactivity_timeout={int(TTS_CONNECTION_TTL) + 30}"
+        )
+        websocket = await websockets.connect(
+            uri, additional_headers={"xi-api-key": api_key or ""}
+        )
+        return cls(websocket)
+
+    @property
+    def closed(self) -> bool:
+        return self._reader.done()
+
+    async def send(self, message: dict):
+        self.last_used = time.monotonic()
+        await self.websocket.send(json.dumps(message))
+
+    async def open_context(self) -> TTSContext:
+        context = TTSContext(self, uuid.uuid4().hex)
+        self.contexts[context.context_id] = context
+        await self.send(
+            {"text": " ", "context_id": context.context_id, "voice_settings": VOICE_SETTINGS}
+        )
+        return context
+
+    def release(self, context: TTSContext):
+        self.contexts.pop(context.context_id, None)
+        self.last_used = time.monotonic()
+
+    async def _read(self):
+        try:
+            async for message in self.websocket:
+                data = json.loads(message)
+                context = self.contexts.get(data.get("contextId"))
+                if context is None:
+                    continue
+                if data.get("audio"):
+                    if context.first_audio is None:
+                        context.first_audio = time.perf_counter()
+                        upstream_latency.observe(
+                            context.first_audio - context.opened, "elevenlabs", "first_audio"
+                        )
+                    context._audio.put_nowait(base64.b64decode(data["audio"]))
+                if data.get("isFinal"):
+                    context.completed = True
+                    context._audio.put_nowait(None)
+        except websockets.exceptions.ConnectionClosed:
+            print("TTS connection closed")
+        finally:
+            # End every open context so no listener waits forever
+            for context in self.contexts.values():
+                context._audio.put_nowait(None)
+
+    async def close(self):
+        try:
+            await self.websocket.send(json.dumps({"close_socket": True}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        await self.websocket.close()
+        self._reader.cancel()
+
+
+class TTSSessionManager:
+    """Keeps a warm ElevenLabs connection per (voice_id, model_id).
+
+    Connections are opened on first use (or by warm()) and reused by every
+    later utterance with the same voice; ones with no open context for
+    ttl seconds are closed by a background reaper.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, ttl: float = TTS_CONNECTION_TTL, history: int = 1000):
+        self.api_key = api_key
+        self.ttl = ttl
+        self.connections: Dict[tuple, TTSConnection] = {}
+        self._connecting: Dict[tuple, asyncio.Task] = {}
+        self._reaper = None
+        # Seconds to get a usable connection, split by whether it was new
+        self.connect_times = deque(maxlen=history)
+        self.reuse_times = deque(maxlen=history)
+
+    async def _connect(self, key: tuple) -> TTSConnection:
+        voice_id, model_id = key
+        api_key = self.api_key or os.getenv("ELEVENLABS_API_KEY")
+        started = time.perf_counter()
+        connection = await TTSConnection.connect(voice_id, model_id, api_key)
+        upstream_latency.observe(time.perf_counter() - started, "elevenlabs", "connect")
+        self.connections[key] = connection
+        return connection
+
+    async def acquire(self, voice_id: str, model_id: str = TTS_MODEL_ID) -> TTSConnection:
+        started = time.perf_counter()
+        key = (voice_id, model_id)
+        connection = self.connections.get(key)
+        if connection is not None and not connection.closed:
+            self.reuse_times.append(time.perf_counter() - started)
+            return connection
+
+        # Concurrent callers for the same voice share one handshake
+        if key not in self._connecting:
+            self._connecting[key] = asyncio.create_task(self._connect(key))
+        try:
+            connection = await asyncio.shield(self._connecting[key])
+        finally:
+            task = self._connecting.get(key)
+            if task is not None and task.done():
+                self._connecting.pop(key, None)
+        self.connect_times.append(time.perf_counter() - started)
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        return connection
+
+    async def warm(self, voice_id: str, model_id: str = TTS_MODEL_ID):
+        """Open the connection for voice_id ahead of its first utterance."""
+        try:
+            await self.acquire(voice_id, model_id)
+        except Exception as e:
+            print(f"Error warming TTS connection for {voice_id}: {e}")
+
+    @asynccontextmanager
+    async def context(self, voice_id: str, model_id: str = TTS_MODEL_ID):
+        connection = await self.acquire(voice_id, model_id)
+        context = await connection.open_context()
+        try:
+            yield context
+        finally:
+            connection.release(context)
+
+    async def _reap(self):
+        while self.connections:
+            await asyncio.sleep(min(self.ttl, 10))
+            now = time.monotonic()
+            for key, connection in list(self.connections.items()):
+                idle = not connection.contexts and now - connection.last_used >= self.ttl
+                if connection.closed or idle:
+                    del self.connections[key]
+                    await connection.close()
+
+    def stats(self) -> dict:
+        def mean(values):
+            return sum(values) / len(values) if values else 0.0
+
+        return {
+            "connections": len(self.connections),
+            "connects": len(self.connect_times),
+            "reuses": len(self.reuse_times),
+            "avg_connect_seconds": mean(self.connect_times),
+            "avg_reuse_seconds": mean(self.reuse_times),
+        }
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for connection in list(self.connections.values()):
+            await connection.close()
+        self.connections.clear()
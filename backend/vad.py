@@ -0,0 +1,146 @@
+import os
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+# "1" turns server-side voice activity detection on for every /ws session;
+# a session can still pick with ?vad=0 / ?vad=1
+VAD_ENABLED = os.getenv("VAD_ENABLED", "0") == "1"
+# Minimum frame RMS counted as speech (float32 samples in [-1, 1])
+VAD_THRESHOLD = float(os.getenv("VAD_THRESHOLD", "0.01"))
+# Silence that ends an utterance, speech that starts one, and audio kept
+# from before the start of speech so the first phoneme isn't clipped
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "500"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "100"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))
+
+
+class VadSegment(NamedTuple):
+    audio: np.ndarray
+    speech_started: bool
+    speech_ended: bool
+
+
+class VoiceActivityDetector:
+    """Energy-based VAD for a stream of float32 samples.
+
+    Audio is split into frame_ms frames whose RMS is computed in one NumPy
+    pass per chunk. A frame is speech when it is above both threshold and
+    a multiple of the tracked noise floor. min_speech_ms of consecutive
+    speech starts an utterance and hangover_ms of silence ends it; only
+    audio inside utterances (plus preroll_ms before each) is passed on, so
+    silence never reaches the STT engine.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        threshold: float = VAD_THRESHOLD,
+        hangover_ms: int = VAD_HANGOVER_MS,
+        min_speech_ms: int = VAD_MIN_SPEECH_MS,
+        preroll_ms: int = VAD_PREROLL_MS,
+        noise_ratio: float = 3.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.threshold = threshold
+        self.noise_ratio = noise_ratio
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        preroll_frames = max(preroll_ms // frame_ms, self.min_speech_frames)
+        self._preroll = deque(maxlen=preroll_frames)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._noise_floor = 0.0
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        # Frames seen so far, and the index of the last voiced one
+        self._frames = 0
+        self._last_voiced_frame = None
+
+        self.samples_in = 0
+        self.samples_out = 0
+        # Seconds of audio from the last voiced frame to the end of speech
+        self.detection_latency = []
+
+    def _is_speech(self, frames: np.ndarray) -> np.ndarray:
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        voiced = rms >= max(self.threshold, self._noise_floor * self.noise_ratio)
+        silent = rms[~voiced]
+        if silent.size:
+            # Slow-moving average of the background level
+            self._noise_floor = 0.95 * self._noise_floor + 0.05 * float(silent.mean())
+        return voiced
+
+    def process(self, samples: np.ndarray) -> VadSegment:
+        """Feed a chunk; returns the samples to forward and any speech boundaries in it.
+
+        At most one boundary is reported per chunk; audio after an end of
+        speech stays buffered for the next call.
+        """
+        self.samples_in += samples.size
+        samples = np.concatenate((self._pending, samples))
+        count = samples.size // self.frame_size
+        frames = samples[: count * self.frame_size].reshape(count, self.frame_size)
+        self._pending = samples[count * self.frame_size :]
+        voiced = self._is_speech(frames) if count else np.zeros(0, dtype=bool)
+
+        out = []
+        started = ended = False
+        for index in range(count):
+            frame = frames[index]
+            self._frames += 1
+            if voiced[index]:
+                self._last_voiced_frame = self._frames
+            if not self.in_speech:
+                self._preroll.append(frame)
+                self._voiced_run = self._voiced_run + 1 if voiced[index] else 0
+                if self._voiced_run >= self.min_speech_frames:
+                    self.in_speech = started = True
+                    self._silent_run = 0
+                    out.extend(self._preroll)
+                    self._preroll.clear()
+                continue
+
+            out.append(frame)
+            self._silent_run = 0 if voiced[index] else self._silent_run + 1
+            if self._silent_run >= self.hangover_frames:
+                self._end()
+                ended = True
+                self.detection_latency.append(
+                    (self._frames - self._last_voiced_frame) * self.frame_ms / 1000
+                )
+                # Hold back the rest of the chunk until the next call
+                rest = frames[index + 1 :].reshape(-1)
+                self._pending = np.concatenate((rest, self._pending))
+                break
+
+        audio = np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+        self.samples_out += audio.size
+        return VadSegment(audio, started, ended)
+
+    def _end(self):
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._preroll.clear()
+
+    def end_speech(self) -> bool:
+        """End the current utterance from outside (e.g. the client); False if none was open."""
+        was_speaking = self.in_speech
+        self._end()
+        return was_speaking
+
+    def stats(self) -> dict:
+        saved = self.samples_in - self.samples_out
+        latency = self.detection_latency
+        return {
+            "seconds_in": self.samples_in / self.sample_rate,
+            "seconds_out": self.samples_out / self.sample_rate,
+            "bandwidth_saved": saved / self.samples_in if self.samples_in else 0.0,
+            "utterances": len(latency),
+            "avg_detection_latency_seconds": sum(latency) / len(latency) if latency else 0.0,
+        }
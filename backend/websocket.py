@@ -1,31 +1,30 @@
-import asyncio
 import websockets
-import json
 import urllib.parse
-import base64
 
 # Import the shared state from a new module
 from shared_state import connected_clients
+from connections import Connection
+from tracing import log
 
 
-async def audio_broadcast_handler(websocket, path=None):
-    # Extract user_id from query parameters using the path argument
-    query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)
+async def audio_broadcast_handler(websocket):
+    # websockets passes only the connection; the query is on its request
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(websocket.request.path).query)
     user_id = query.get("user_id", [None])[0]
 
     if not user_id:
         await websocket.close(1008, "Missing user ID")
         return
 
-    # Register client with their user ID
-    connected_clients[user_id] = websocket
+    # Register client's audio channel with their user ID
+    connection = Connection.for_websockets(websocket, binary_audio=True)
+    connected_clients.register_audio(user_id, connection)
     print(f"New client connected: {user_id}")
 
     try:
         await websocket.wait_closed()
     finally:
-        if user_id in connected_clients:
-            del connected_clients[user_id]
+        connected_clients.unregister_audio(user_id, connection)
         print(f"Client disconnected: {user_id}")
 
 
@@ -35,22 +34,18 @@ async def start_websocket_server():
     return server
 
 
-async def broadcast_audio_stream(audio_stream, recipient_id):
-    print(f"Broadcasting audio stream to recipient: {recipient_id}")
-    print(connected_clients)
+async def broadcast_audio_stream(
+    audio_stream, recipient_id, on_first_chunk=None, on_first_delivered=None
+):
+    log.debug("Broadcasting audio stream to recipient: %s", recipient_id)
     async for chunk in audio_stream:
-        print("Chunk received")
-        if chunk and recipient_id in connected_clients:
-            print(f"Sending audio chunk to recipient: {recipient_id}")
-            # Convert bytes to base64 to ensure safe transmission
-            chunk_base64 = base64.b64encode(chunk).decode("utf-8")
-            # Send only to the intended recipient
-            await connected_clients[recipient_id].send_text(
-                json.dumps({"type": "audio_chunk", "data": chunk_base64})
-            )
-
-    if recipient_id in connected_clients:
-        # Send end of stream message as text
-        await connected_clients[recipient_id].send_text(
-            json.dumps({"type": "end_of_stream"})
-        )
+        if chunk:
+            if on_first_chunk:
+                on_first_chunk()
+                on_first_chunk = None
+            # Enqueues only; a slow listener can't hold up the TTS stream
+            connected_clients.send_audio(recipient_id, chunk, on_first_delivered)
+            on_first_delivered = None
+
+    # Send end of stream message as text
+    connected_clients.send_audio_control(recipient_id, {"type": "end_of_stream"})
@@ -7,30 +7,56 @@ import { useCallback, useEffect, useRef, useState } from "react";
 import { useAuth } from "../contexts/AuthContext";
 
 const RECORDING_SAMPLE_RATE = 16_000;
+// Sent as 16-bit PCM, half the size of the worklet's float32 samples
+const AUDIO_ENCODING = "pcm_s16le";
+
+// Binary audio frame: flags (u8), sequence number (u32 LE), then raw pcm_s16le
+const FRAME_HEADER_SIZE = 5;
+const FRAME_FLAG_TERMINAL = 0x01;
+
+const encodeAudioFrame = (
+  sequence: number,
+  terminal: boolean,
+  audio?: Float32Array
+) => {
+  const payloadSize = audio ? audio.length * 2 : 0;
+  const frame = new Uint8Array(FRAME_HEADER_SIZE + payloadSize);
+  const view = new DataView(frame.buffer);
+  view.setUint8(0, terminal ? FRAME_FLAG_TERMINAL : 0);
+  view.setUint32(1, sequence, true);
+  if (audio) {
+    for (let i = 0; i < audio.length; i++) {
+      const sample = Math.max(-1, Math.min(1, audio[i]));
+      view.setInt16(
+        FRAME_HEADER_SIZE + i * 2,
+        sample < 0 ? sample * 0x8000 : sample * 0x7fff,
+        true
+      );
+    }
+  }
+  return frame;
+};
 
 const AudioMicrophone: React.FC = () => {
   const { user } = useAuth();
   const { callState } = useAuth();
   const { startRecording, stopRecording } = usePCMAudioRecorder();
   const websocketRef = useRef<WebSocket | null>(null);
+  const sequenceRef = useRef(0);
   const [audioContext, setAudioContext] = useState<AudioContext | null>(null);
   const [spacebarPressed, setSpacebarPressed] = useState(false);
   const [terminalChunkSent, setTerminalChunkSent] = useState(true);
 
   usePCMAudioListener((audio: Float32Array) => {
     if (spacebarPressed) {
-      console.log("Sending audio chunk");
-      const base64Audio = btoa(
-        String.fromCharCode(...new Uint8Array(audio.buffer))
-      );
       websocketRef.current?.send(
-        JSON.stringify({ audio: base64Audio, terminal: false })
+        encodeAudioFrame(sequenceRef.current++, false, audio)
       );
     } else {
       if (!terminalChunkSent) {
         console.log("Sending terminal chunk");
         websocketRef.current?.send(
-          JSON.stringify({ audio: "", terminal: true })
+          encodeAudioFrame(sequenceRef.current++, true)
         );
         setTerminalChunkSent(true);
       }
@@ -72,7 +98,7 @@ const AudioMicrophone: React.FC = () => {
     const connectWebSocket = () => {
       try {
         websocketRef.current = new WebSocket(
-          `${import.meta.env.VITE_WS_SERVER_URL}/ws?user_id=${user?.id}`
+          `${import.meta.env.VITE_WS_SERVER_URL}/ws?user_id=${user?.id}&encoding=${AUDIO_ENCODING}&sample_rate=${RECORDING_SAMPLE_RATE}`
         );
       } catch (error) {
         console.error("WebSocket connection error:", error);